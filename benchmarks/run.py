@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+Times and memory-profiles the phlorest commands on synthetic repositories.
+
+    python benchmarks/run.py --sizes small,medium --output bench.json
+    python benchmarks/run.py --sizes small --compare bench.json
+
+Each command is run in-process against a fresh `Repos` (so nothing is shared
+between commands), and the wall time and peak traced memory of the best of
+`--repeat` runs are saved as JSON. Memory is traced in a separate run from
+the one that is timed.
+"""
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from pathlib import Path
+from argparse import Namespace
+from contextlib import redirect_stdout
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from phlorest import Repos, commands  # noqa: E402
+from phlorest.synthetic import make_repository  # noqa: E402
+
+SIZES = {
+    'tiny': dict(ndatasets=5, ntaxa=10, ntrees=10, nchar=10),
+    'small': dict(ndatasets=20, ntaxa=20, ntrees=100, nchar=100),
+    'medium': dict(ndatasets=100, ntaxa=50, ntrees=1000, nchar=1000),
+    'large': dict(ndatasets=300, ntaxa=200, ntrees=5000, nchar=5000),
+}
+
+COMMANDS = [
+    ('list', commands.listdatasets, lambda first: []),
+    ('check', commands.check, lambda first: []),
+    ('validate', commands.validate, lambda first: []),
+    ('readme', commands.readme, lambda first: [first]),
+    ('itemise', commands.itemise, lambda first: ['scaling']),
+]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, cwd=str(ROOT)
+        ).decode('utf8').strip()
+    except (OSError, subprocess.CalledProcessError):  # pragma: no cover
+        return None
+
+
+def startup_time(repeat=5):
+    """Returns the best time to start python and import the CLI, less a bare interpreter"""
+    def best(code):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.check_call([sys.executable, '-c', code], cwd=str(ROOT))
+            times.append(time.perf_counter() - start)
+        return min(times)
+    return best("import phlorest.__main__") - best("pass")
+
+
+def call(func, repos_path, args, cache):
+    repos = Repos(repos_path, cache=cache)
+    with redirect_stdout(io.StringIO()):
+        func(Namespace(repos=repos, args=args))
+
+
+def measure(func, repos_path, args, cache):
+    """
+    Returns (seconds, peak bytes) for a command. tracemalloc slows python
+    down several-fold, so the time and the memory are taken from two
+    separate runs.
+    """
+    start = time.perf_counter()
+    call(func, repos_path, args, cache)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        call(func, repos_path, args, cache)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def run(sizes, repeat=3, cache=False):
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = make_repository(Path(tmp) / 'repos', **SIZES[size])
+            first = sorted(Repos(path).datasets)[0]
+            for name, func, get_args in COMMANDS:
+                runs = [measure(func, path, get_args(first), cache) for _ in range(repeat)]
+                seconds = min(r[0] for r in runs)
+                peak = max(r[1] for r in runs)
+                print("%-8s %-10s %10.4fs %12d bytes" % (size, name, seconds, peak))
+                results.append({
+                    'size': size, 'params': SIZES[size], 'command': name,
+                    'seconds': seconds, 'peak_bytes': peak,
+                })
+    return results
+
+
+def compare(results, baseline):
+    old = {(r['size'], r['command']): r for r in baseline['results']}
+    for r in results:
+        o = old.get((r['size'], r['command']))
+        if o:
+            print("%-8s %-10s time x%.2f  memory x%.2f" % (
+                r['size'], r['command'],
+                r['seconds'] / o['seconds'] if o['seconds'] else 0,
+                r['peak_bytes'] / o['peak_bytes'] if o['peak_bytes'] else 0,
+            ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument('--sizes', default='tiny,small', help="comma-separated: %s" % ", ".join(SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cache', action='store_true', help="enable the on-disk repository cache")
+    parser.add_argument('--output', help="save results as JSON to this file")
+    parser.add_argument('--compare', help="compare against a previously saved JSON file")
+    opts = parser.parse_args(argv)
+
+    startup = startup_time()
+    print("startup  %10.4fs" % startup)
+    results = run(opts.sizes.split(','), repeat=opts.repeat, cache=opts.cache)
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'cache': opts.cache,
+        'startup_seconds': startup,
+        'results': results,
+    }
+    if opts.output:
+        with open(opts.output, 'w', encoding='utf8') as handle:
+            json.dump(report, handle, indent=2)
+    if opts.compare:
+        with open(opts.compare, 'r', encoding='utf8') as handle:
+            compare(results, json.load(handle))
+
+
+if __name__ == '__main__':
+    main()
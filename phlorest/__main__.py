@@ -24,7 +24,7 @@ def main():  # pragma: no cover
     parser = ArgumentParserWithLogging(phlorest.__name__)
     parser.add_argument(
         '--repos',
-        type=phlorest.Repos,
-        default=phlorest.Repos(PHLOREST),
+        type=lambda path: phlorest.Repos(path, cache=True),
+        default=phlorest.Repos(PHLOREST, cache=True),
         help='Location of clone of phlorest data (defaults to ./phlorest)')
     sys.exit(parser.main())
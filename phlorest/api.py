@@ -1,23 +1,204 @@
 # coding=utf-8
+import os
+from functools import partial
 from pathlib import Path
 from .phlorest import Phlorest
+from .index import RepositoryIndex, DatasetRecord
+from .glottolog import get_glottolog
+from .manifest import Manifest, hash_file
+from .taxonindex import TaxonIndex
+from .validation import Collector, VERSION, validate_dataset
+
+CACHE_DIR = '.phlorest'
+
+
+def run_jobs(func, items, jobs=1):
+    """
+    Yields `func(item)` for each of `items` in order, fanning the calls out
+    over a pool of `jobs` processes if jobs > 1.
+    """
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield from executor.map(func, items)
+    else:
+        yield from map(func, items)
 
 
 class Repos:
-    def __init__(self, path):
+    def __init__(self, path, cache=False):
         self.path = Path(path)
+        self.cache_dir = self.path / CACHE_DIR if cache else None
         self._datasets = None
+        self._records = None
+        self._taxon_index = None
 
     def __repr__(self):
         return "<Phlorest Repository in %s>" % self.path
-    
+
     @property
     def datasets(self):
         if not self._datasets:
             self._datasets = {k: v for k, v in self.load(self.path)}
         return self._datasets
 
+    def reload(self):
+        """Rescans the repository for datasets, keeping those already loaded"""
+        loaded = self._datasets or {}
+        self._datasets = {k: loaded.get(k, v) for k, v in self.load(self.path)}
+        self._records, self._taxon_index = None, None
+
+    @property
+    def index(self):
+        if self.cache_dir:
+            return RepositoryIndex(self.cache_dir / 'index.sqlite')
+
+    @property
+    def records(self):
+        """
+        The metadata and check status of each dataset as {name: DatasetRecord},
+        read from the on-disk index when caching is enabled.
+        """
+        if self._records is None:
+            if self.index:
+                self._records = self.index.update(self.datasets)
+            else:
+                self._records = {
+                    k: DatasetRecord.from_dataset(k, v) for k, v in self.datasets.items()
+                }
+        return self._records
+
+    def record(self, name):
+        """
+        Returns the `DatasetRecord` of dataset `name`, without checking the
+        other datasets if the records have not been built yet.
+        """
+        if self._records is not None:
+            return self._records[name]
+        if self.index:
+            return self.index.get(name, self.datasets[name])
+        return DatasetRecord.from_dataset(name, self.datasets[name])
+
+    def iter_records(self):
+        """
+        Yields (name, DatasetRecord) in sorted order as each record becomes
+        available, so that callers can report on a dataset before the rest
+        of the repository has been checked.
+        """
+        if self._records is not None:
+            for name in sorted(self._records):
+                yield (name, self._records[name])
+            return
+        if self.index:
+            records = self.index.iter_update(self.datasets)
+        else:
+            records = (
+                (k, DatasetRecord.from_dataset(k, self.datasets[k])) for k in sorted(self.datasets)
+            )
+        found = {}
+        for name, record in records:
+            found[name] = record
+            yield (name, record)
+        self._records = found
+
+    def tree_counts(self, name):
+        """Returns {'summary': n, 'posterior': n} trees for dataset `name` (None if missing)"""
+        return self.count_trees([name])[name]
+
+    def count_trees(self, names):
+        """
+        Returns {name: {'summary': n, 'posterior': n}} for the datasets in
+        `names`, looking up all their tree files in the index at once.
+        """
+        paths = {
+            name: {k: getattr(self.datasets[name], k) for k in ('summary', 'posterior')}
+            for name in names
+        }
+        found = [p for name in names for p in paths[name].values() if p]
+        if self.index:
+            counts = self.index.ntrees(found)
+        else:
+            counts = {
+                p: self.datasets[name].trees(p).ntrees
+                for name in names for p in paths[name].values() if p
+            }
+        return {
+            name: {k: counts[p] if p else None for k, p in paths[name].items()} for name in names
+        }
+
+    @property
+    def taxon_index(self):
+        """A `TaxonIndex` over the taxa of every dataset"""
+        if self._taxon_index is None:
+            self._taxon_index = TaxonIndex.from_records(self.records)
+        return self._taxon_index
+
+    @property
+    def manifest(self):
+        if self.cache_dir:
+            return Manifest(self.cache_dir / 'validate.json')
+
+    def _validate(self, names, jobs=1, profiler=None, support=None, glottolog=None, topologies=False):
+        if jobs > 1 and profiler is None:
+            dirnames = [self.datasets[n].dirname for n in names]
+            func = partial(
+                validate_dataset, support=support, glottolog=glottolog, topologies=topologies)
+            yield from zip(names, run_jobs(func, dirnames, jobs))
+        else:  # validate in process, reusing the parsed datasets
+            if glottolog is not None:
+                glottolog = get_glottolog(str(glottolog))
+            for name in names:
+                collector = Collector(name)
+                self.datasets[name].profiler = profiler
+                self.datasets[name].validate(
+                    collector=collector, support=support, glottolog=glottolog, topologies=topologies)
+                yield (name, collector.results)
+
+    def validate_all(
+            self, names=None, jobs=1, force=False, profiler=None, support=None, glottolog=None,
+            topologies=False):
+        """
+        Validates the datasets in `names` (default: all) in sorted order,
+        yielding (name, [Result, ...]) as each dataset finishes.
+
+        When caching is enabled, results are replayed from the manifest for
+        datasets whose inputs are unchanged, unless `force` is set.
+        When `profiler` is given every dataset is validated in process and
+        its stages are recorded. `support` is passed on to `Phlorest.validate`,
+        `glottolog` is the path of a Glottolog snapshot to check taxa.csv
+        against, and `topologies` reports the distinct posterior topologies.
+        """
+        names = sorted(n for n in self.datasets if names is None or n in names)
+        manifest = self.manifest
+        if manifest is None or profiler is not None:
+            yield from self._validate(names, jobs, profiler, support, glottolog, topologies)
+            return
+
+        options = {'version': VERSION, 'support': support}
+        if glottolog is not None:  # the results depend on the snapshot too
+            options['glottolog'] = hash_file(glottolog)
+        if topologies:
+            options['topologies'] = True
+        inputs = {n: manifest.inputs(n, self.datasets[n].dirname) for n in names}
+        cached = {} if force else {n: manifest.get(n, inputs[n], options) for n in names}
+        stale = [n for n in names if cached.get(n) is None]
+        fresh = self._validate(
+            stale, jobs, support=support, glottolog=glottolog, topologies=topologies)
+        try:
+            for name in names:
+                if cached.get(name) is not None:
+                    yield (name, cached[name])
+                else:
+                    _, results = next(fresh)
+                    manifest.set(name, inputs[name], results, options)
+                    yield (name, results)
+        finally:
+            manifest.save()
+
     def load(self, path):
-        for dirname in path.iterdir():
-            if dirname.is_dir() and (dirname / 'details.txt').exists():
-                yield (dirname.name, Phlorest(dirname))
+        with os.scandir(str(path)) as scanner:
+            for entry in scanner:
+                if entry.is_dir():
+                    dataset = Phlorest(entry.path, cache_dir=self.cache_dir)
+                    if 'details.txt' in dataset.entries():
+                        yield (entry.name, dataset)
@@ -0,0 +1,60 @@
+# coding=utf-8
+"""
+Reads the character partitions out of BEAST2 XML files.
+
+The alignments in these files can be huge, so the XML is read with
+`iterparse`: alignments are indexed by id as they are seen, and sequence
+payloads are discarded as soon as they have been parsed.
+"""
+import xml.etree.ElementTree as ElementTree
+
+
+def get_partition(node):
+    """Returns (id, first, last) from the `filter="first-last"` of `node`"""
+    x, y = [int(_) for _ in node.get('filter').split("-")]
+    return (node.get('id'), x, y)
+
+
+def strip_ref(data_id):
+    return data_id.lstrip("@")
+
+
+def iter_partitions(source):
+    """
+    Yields (id, first, last, ascertained) for the data of each TreeLikelihood
+    in the BEAST2 XML `source` (a filename or file object).
+    """
+    alignments = {}  # id -> (ascertained, alignment partition, first child partition)
+    likelihoods = []  # in document order: ('alignment' | 'child' | 'partition', value, ascertained)
+    for _, node in ElementTree.iterparse(source, events=('end',)):
+        if node.tag == 'sequence':
+            node.clear()
+        elif node.tag == 'alignment' and node.get('id'):
+            child = node.find('./data')
+            alignments[node.get('id')] = (
+                node.get('ascertained') == 'true',
+                get_partition(node) if node.get('filter') else None,
+                get_partition(child) if child is not None and child.get('filter') else None,
+            )
+            node.clear()
+        elif node.tag == 'distribution' and node.get('spec') == 'TreeLikelihood':
+            if node.get('data'):
+                likelihoods.append(('child', strip_ref(node.get('data')), None))
+            else:
+                data = node.find('./data')
+                ascertained = data.get('ascertained') == 'true'
+                if data.get('data'):
+                    likelihoods.append(('alignment', strip_ref(data.get('data')), ascertained))
+                else:
+                    partition = get_partition(node.find('./data/data'))
+                    likelihoods.append(('partition', partition, ascertained))
+            node.clear()
+
+    for kind, value, ascertained in likelihoods:
+        if kind == 'partition':
+            yield value + (ascertained,)
+        elif kind == 'alignment':
+            yield alignments[value][1] + (ascertained,)
+        else:  # the data is an alignment, and its ascertainment applies
+            ascertained, _, child = alignments[value]
+            yield child + (ascertained,)
@@ -0,0 +1,296 @@
+# coding=utf-8
+"""
+Clades as integer bitsets.
+
+Each taxon is given a bit in a fixed ordering (`TaxonSet`), so that a clade
+is the integer with the bits of its descendant tips set. Clade frequencies
+in a posterior are then a dictionary of integers, using memory proportional
+to the number of distinct clades rather than to the number of trees.
+
+The set of clades of a tree does not depend on the order in which its
+children are written, so it also gives a canonical hash of the topology,
+which is used to count the distinct topologies in a posterior.
+"""
+import re
+import hashlib
+from collections import Counter, namedtuple
+
+from .compressed import open_replacing, open_text
+from .trees import TreeFile, get_newick, iter_tree_statements, parse_translate, split_tree, strip_comments, unquote
+
+_TOKEN = re.compile(r"'(?:[^']|'')*'|[(),;]|:[^,();]*|[^\s(),:;]+")
+
+
+class TaxonSet:
+    """A fixed ordering of taxa, mapping each to a bit"""
+    def __init__(self, taxa=()):
+        self.taxa = []
+        self.bits = {}
+        for taxon in sorted(taxa):
+            self.bit(taxon)
+
+    def __len__(self):
+        return len(self.taxa)
+
+    def bit(self, taxon):
+        """Returns the bit for `taxon`, giving unseen taxa the next free bit"""
+        if taxon not in self.bits:
+            self.bits[taxon] = 1 << len(self.taxa)
+            self.taxa.append(taxon)
+        return self.bits[taxon]
+
+    def bitset(self, taxa):
+        bitset = 0
+        for taxon in taxa:
+            bitset |= self.bit(taxon)
+        return bitset
+
+    def labels(self, bitset):
+        """Returns the taxa in `bitset`"""
+        return [t for i, t in enumerate(self.taxa) if bitset >> i & 1]
+
+
+class Tree:
+    """
+    A tree as the bitset of its tips, the set of its clades, and the length
+    of the branch above each clade (and tip).
+    """
+    def __init__(self, tips, clades, lengths=None):
+        self.tips = tips
+        self.clades = clades
+        self.lengths = lengths or {}
+
+    def __repr__(self):
+        return '<Tree with %d clades>' % len(self.clades)
+
+    @classmethod
+    def from_newick(cls, newick, taxonset, translate=None):
+        translate = translate or {}
+        stack, clades, lengths = [0], set(), {}
+        last = None  # the bitset of the node just completed
+        for token in _TOKEN.findall(strip_comments(newick)):
+            if token == '(':
+                stack.append(0)
+                last = None
+            elif token == ')':
+                last = stack.pop()
+                clades.add(last)
+                stack[-1] |= last
+            elif token in (',', ';'):
+                last = None
+            elif token.startswith(':'):
+                if last is not None:
+                    try:
+                        lengths[last] = float(token[1:])
+                    except ValueError:
+                        pass
+            elif last is None:  # a tip label
+                label = unquote(token)
+                last = taxonset.bit(translate.get(label, label))
+                stack[-1] |= last
+            # anything else is an internal node label
+        tips = stack[0]
+        # neither tips nor the root split the taxa
+        clades = frozenset(c for c in clades if c != tips and c & (c - 1))
+        return cls(tips, clades, lengths)
+
+    def topology(self, digits=None):
+        """
+        Returns a hash of the (rooted) topology that does not depend on the
+        order of the children of each node. If `digits` is given, the branch
+        lengths rounded to this many digits are part of the hash as well.
+
+        Hashes are comparable between trees with the same `TaxonSet`.
+        """
+        parts = [self.tips] + sorted(self.clades)
+        if digits is not None:
+            parts.extend(sorted((c, round(v, digits)) for c, v in self.lengths.items()))
+        return hashlib.sha1(repr(parts).encode('ascii')).hexdigest()
+
+
+def iter_trees(path, taxonset):
+    """Yields a `Tree` for each tree in the nexus file `path`"""
+    translate = {}
+    with open_text(path) as handle:
+        for kind, statement in iter_tree_statements(handle):
+            if kind == 'translate':
+                translate.update(parse_translate(statement))
+            elif kind == 'tree':
+                yield Tree.from_newick(get_newick(statement), taxonset, translate)
+
+
+class CladeCounts:
+    """The frequencies of clades, and the tip sets seen, across a set of trees"""
+    def __init__(self, taxonset):
+        self.taxonset = taxonset
+        self.counts = Counter()
+        self.tipsets = Counter()
+        self.ntrees = 0
+
+    def __repr__(self):
+        return '<CladeCounts of %d clades in %d trees>' % (len(self.counts), self.ntrees)
+
+    @classmethod
+    def from_file(cls, path, taxonset=None):
+        counts = cls(taxonset or TaxonSet())
+        for tree in iter_trees(path, counts.taxonset):
+            counts.add(tree)
+        return counts
+
+    def add(self, tree):
+        self.counts.update(tree.clades)
+        self.tipsets[tree.tips] += 1
+        self.ntrees += 1
+
+    def frequency(self, clade):
+        return self.counts[clade] / self.ntrees if self.ntrees else 0.0
+
+
+def first_tree(path, taxonset):
+    """Returns the first tree in `path` as a `Tree`, or None if there is none"""
+    return next(iter_trees(path, taxonset), None)
+
+
+def read_trees(summary, posterior):
+    """
+    Returns (tree, counts) for the first tree in `summary` (None if there is
+    none) and the `CladeCounts` of the trees in `posterior`, with one `TaxonSet`.
+    """
+    taxonset = TaxonSet()
+    tree = first_tree(summary, taxonset)
+    return tree, CladeCounts.from_file(posterior, taxonset)
+
+
+def compare_trees(tree, counts, threshold=0.5):
+    """Like `compare`, for a summary `tree` and the `CladeCounts` of a posterior"""
+    taxonset = counts.taxonset
+    posterior_tips = 0
+    for tips in counts.tipsets:
+        posterior_tips |= tips
+    summary_tips = tree.tips if tree else 0
+    unsupported = []
+    if tree:
+        for clade in sorted(tree.clades, key=lambda c: (bin(c).count('1'), c)):
+            frequency = counts.frequency(clade)
+            if frequency < threshold:
+                unsupported.append((taxonset.labels(clade), frequency))
+    return (
+        taxonset.labels(summary_tips & ~posterior_tips),
+        taxonset.labels(posterior_tips & ~summary_tips),
+        unsupported,
+    )
+
+
+def compare(summary, posterior, threshold=0.5):
+    """
+    Compares the first tree in `summary` to the trees in `posterior`.
+
+    Returns (summary_only, posterior_only, unsupported) where the first two
+    are the taxa found in only one of the files (in any of the posterior
+    trees), and unsupported is a list of ([taxa, ...], frequency) for the
+    summary clades with a posterior frequency below `threshold`.
+    """
+    return compare_trees(*read_trees(summary, posterior), threshold)
+
+
+def varying_tips(counts):
+    """Returns the taxa that are missing from some, but not all, of the trees in `counts`"""
+    union, common = 0, None
+    for tips in counts.tipsets:
+        union |= tips
+        common = tips if common is None else common & tips
+    return counts.taxonset.labels(union & ~(common or 0))
+
+
+class TopologyCounts:
+    """The number of trees with each distinct topology in a file"""
+    def __init__(self, taxonset, digits=None):
+        self.taxonset = taxonset
+        self.digits = digits
+        self.counts = Counter()
+        self.first = {}  # topology -> index of its first tree
+        self.ntrees = 0
+        self._hashes = {}  # (tips, clades) -> topology, so that each topology is hashed once
+
+    def __repr__(self):
+        return '<TopologyCounts of %d topologies in %d trees>' % (len(self.counts), self.ntrees)
+
+    def __len__(self):
+        return len(self.counts)
+
+    @classmethod
+    def from_file(cls, path, taxonset=None, digits=None):
+        counts = cls(taxonset or TaxonSet(), digits)
+        for tree in iter_trees(path, counts.taxonset):
+            counts.add(tree)
+        return counts
+
+    def add(self, tree):
+        if self.digits is None:
+            key = (tree.tips, tree.clades)
+            topology = self._hashes.get(key)
+            if topology is None:
+                topology = self._hashes[key] = tree.topology()
+        else:
+            topology = tree.topology(self.digits)
+        self.first.setdefault(topology, self.ntrees)
+        self.counts[topology] += 1
+        self.ntrees += 1
+        return topology
+
+    def frequencies(self):
+        """Returns [(topology, count, frequency), ...], most frequent first"""
+        return [(t, n, n / self.ntrees) for t, n in self.counts.most_common()]
+
+
+def count_topologies(path):
+    return TopologyCounts.from_file(path)
+
+
+Posterior = namedtuple('Posterior', ['trees', 'clades', 'topologies'])
+
+
+def read_posterior(path):
+    """
+    Reads the trees in `path` in a single pass, returning a `Posterior` of
+    their `TreeFile` summary, `CladeCounts` and `TopologyCounts`, which
+    share one `TaxonSet`.
+    """
+    trees, taxonset = TreeFile(), TaxonSet()
+    clades, topologies = CladeCounts(taxonset), TopologyCounts(taxonset)
+    with open_text(path) as handle:
+        for kind, statement in iter_tree_statements(handle):
+            trees.add(kind, statement)
+            if kind == 'tree':
+                tree = Tree.from_newick(get_newick(statement), taxonset, trees.translate)
+                clades.add(tree)
+                topologies.add(tree)
+    return Posterior(trees, clades, topologies)
+
+
+def deduplicate(src, dest, digits=None):
+    """
+    Writes the first tree of each distinct topology in `src` to `dest`,
+    weighted by the frequency of the topology with a `[&W ...]` comment, and
+    keeping everything else (e.g. the TRANSLATE block) intact. Returns the
+    `TopologyCounts` of `src`.
+
+    Like `trees.thin`, the file is streamed twice, so memory use depends on
+    the number of distinct topologies rather than the number of trees, and
+    `dest` may be `src`.
+    """
+    counts = TopologyCounts.from_file(src, digits=digits)
+    weights = {i: counts.counts[t] / counts.ntrees for t, i in counts.first.items()}
+    index = 0
+    with open_text(src) as handle, open_replacing(dest) as out:
+        for kind, statement in iter_tree_statements(handle):
+            if kind == 'tree':
+                if index in weights:
+                    name, newick = split_tree(statement)
+                    out.write("\t%s= [&W %.6g] %s;\n" % (name, weights[index], newick))
+                index += 1
+            elif kind == 'translate':
+                out.write("\t%s;\n" % statement)
+            else:
+                out.write("%s;\n" % statement)
+    return counts
@@ -0,0 +1,95 @@
+# coding=utf-8
+"""
+Runs the Makefiles of datasets whose trees are out of date.
+
+A dataset is stale when a tree file its Makefile has a rule for is missing,
+or when its Makefile or any file in `original` is newer than the oldest of
+these tree files. The Makefiles of stale datasets are run in a pool of
+threads, each waiting on its own `make` process, and their output is passed
+on line by line.
+"""
+import os
+import re
+import time
+import subprocess
+import threading
+from collections import namedtuple
+
+MAKE = os.environ.get('MAKE', 'make')
+
+_TARGET = re.compile(r"^(?P<name>summary|posterior)\.trees(?:\.\w+)?\s*:", re.MULTILINE)
+
+BuildResult = namedtuple('BuildResult', ['dataset', 'returncode', 'seconds'])
+
+
+def mtimes(dirname, subdir):
+    try:
+        with os.scandir(os.path.join(str(dirname), subdir)) as scanner:
+            return [e.stat().st_mtime_ns for e in scanner if not e.name.startswith('.')]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def targets(makefile):
+    """Returns the tree files that `makefile` has rules for"""
+    text = makefile.read_text(encoding='utf8')
+    return sorted({m.group('name') for m in _TARGET.finditer(text)})
+
+
+def is_stale(dataset):
+    """Returns True if the trees of `dataset` need to be made again"""
+    if not dataset.makefile:
+        return False
+    outputs = []
+    for name in targets(dataset.makefile):
+        path = getattr(dataset, name)
+        if not path:
+            return True
+        outputs.append(path)
+    if not outputs:
+        return False
+    inputs = mtimes(dataset.dirname, 'original')
+    inputs.append(os.stat(str(dataset.makefile)).st_mtime_ns)
+    oldest = min(os.stat(str(p)).st_mtime_ns for p in outputs)
+    return any(mtime > oldest for mtime in inputs)
+
+
+def run_make(name, dirname, log=None):
+    """
+    Runs `make` in `dirname`, calling `log(name, line)` for each line of its
+    output, and returns a `BuildResult`.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [MAKE, '-C', str(dirname)],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        universal_newlines=True, encoding='utf8', errors='replace',
+    )
+    with process.stdout:
+        for line in process.stdout:
+            if log:
+                log(name, line.rstrip('\n'))
+    returncode = process.wait()
+    return BuildResult(name, returncode, time.perf_counter() - start)
+
+
+def build(datasets, jobs=1, log=None):
+    """
+    Runs the Makefiles of `datasets` ({name: Phlorest}) with at most `jobs`
+    running at once, yielding a `BuildResult` as each one finishes. Calls to
+    `log` are serialised so that lines from different datasets do not mix.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    lock = threading.Lock()
+
+    def locked(name, line):
+        with lock:
+            log(name, line)
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        futures = [
+            executor.submit(run_make, name, datasets[name].dirname, locked if log else None)
+            for name in sorted(datasets)
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,46 @@
+# coding=utf-8
+from pathlib import Path
+
+
+class FileCache:
+    """
+    Memoizes values computed from files.
+
+    Entries are keyed by path and loader, and are invalidated when the file's
+    mtime or size changes, so a file is only parsed again when it is edited.
+    Values with a `close` method (e.g. open files) are closed when evicted.
+    """
+    def __init__(self):
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def stamp(path):
+        stat = path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, path, loader):
+        path = Path(path)
+        key = (str(path), getattr(loader, '__qualname__', None) or repr(loader))
+        stamp = self.stamp(path)
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        if cached is not None:
+            self.evict(cached[1])
+        value = loader(path)
+        self._entries[key] = (stamp, value)
+        return value
+
+    @staticmethod
+    def evict(value):
+        close = getattr(value, 'close', None)
+        if callable(close):
+            close()
+
+    def clear(self):
+        for _, value in self._entries.values():
+            self.evict(value)
+        self._entries = {}
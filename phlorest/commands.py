@@ -1,21 +1,62 @@
 # coding=utf-8
-import warnings
+import sys
+import argparse
 from pathlib import Path
-from textwrap import dedent
 from clldutils.clilib import command, ParserError
-from tabulate import tabulate
 
 CHECKMARK = '✅'
 ERROR = '❌'
 
-@command(name='list', usage="list the datasets")
+
+class CommandParser(argparse.ArgumentParser):
+    """Parses the options given to a single command in `args.args`"""
+    def error(self, message):
+        raise ParserError(message)
+
+
+def add_profile_options(parser):
+    parser.add_argument(
+        '--profile', action='store_true', help="time each stage and print a ranked summary")
+    parser.add_argument('--trace', help="write the stage timings as JSON to this file")
+    parser.add_argument(
+        '--profile-memory', action='store_true',
+        help="also record the peak memory of each stage, which slows down the stages a lot")
+
+
+def report_profile(profiler, opts):
+    if profiler is None:
+        return
+    print()
+    print(profiler.summary())
+    if opts.trace:
+        profiler.write(opts.trace)
+
+
+def get_profiler(opts):
+    if opts.profile or opts.trace or opts.profile_memory:
+        from .profiling import Profiler
+        return Profiler(memory=opts.profile_memory)
+
+
+def add_format_option(parser):
+    from .output import FORMATS
+    parser.add_argument(
+        '--format', choices=FORMATS, default='table',
+        help="output format; jsonl and csv write each dataset as soon as it is done")
+
+
+@command(name='list', usage="list the datasets [--format table|jsonl|csv]")
 def listdatasets(args):
+    from .output import get_writer
+    parser = CommandParser(prog='list')
+    add_format_option(parser)
+    opts = parser.parse_args(args.args)
     
-    def label_trees(errors):
+    def label_trees(record):
         out = ''
-        if 'summary' not in errors:
+        if record['summary']:
             out += '🌿'
-        if 'posterior' not in errors:
+        if record['posterior']:
             out += '🌳'
         return out
     
@@ -33,24 +74,29 @@ def listdatasets(args):
         else:
             return ERROR
     
-    rows = []
-    for i, ds in enumerate(sorted(args.repos.datasets), 1):
-        errors = args.repos.datasets[ds].check()
-        rows.append([
-            i,
-            ds,
-            '🗞' if 'paper' not in errors else '',
-            label_trees(errors),
-            label_scaling(args.repos.datasets[ds].details['scaling']),
-            '💾' if 'nexus' not in errors else '',
-            CHECKMARK if 'characters' not in errors else '',
-            CHECKMARK if 'data' not in errors else '',
-            CHECKMARK if 'cldf' not in errors else '',
-            CHECKMARK if 'source' not in errors else '',
-            CHECKMARK if 'notes' not in errors else '',
-        ])
-    headers = headers=['#', 'Dataset', 'Paper', 'Tree', 'S', 'Nex', 'Chars', 'Data', 'CLDF', 'Bib', 'Notes']
-    print(tabulate(rows, headers=headers, tablefmt="github"))
+    def render(record):
+        return [
+            record['#'],
+            record['dataset'],
+            '🗞' if record['paper'] else '',
+            label_trees(record),
+            label_scaling(record['scaling']),
+            '💾' if record['nexus'] else '',
+            CHECKMARK if record['characters'] else '',
+            CHECKMARK if record['data'] else '',
+            CHECKMARK if record['cldf'] else '',
+            CHECKMARK if record['source'] else '',
+            CHECKMARK if record['notes'] else '',
+        ]
+    
+    present = ['paper', 'summary', 'posterior', 'nexus', 'characters', 'data', 'cldf', 'source', 'notes']
+    headers = ['#', 'Dataset', 'Paper', 'Tree', 'S', 'Nex', 'Chars', 'Data', 'CLDF', 'Bib', 'Notes']
+    fields = ['#', 'dataset', 'scaling'] + present
+    with get_writer(opts.format, fields, headers=headers, render=render) as writer:
+        for i, (ds, record) in enumerate(args.repos.iter_records(), 1):
+            row = {'#': i, 'dataset': ds, 'scaling': record.details.get('scaling')}
+            row.update({f: f not in record.errors for f in present})
+            writer.write(row)
 
 
 @command(name='new', usage="creates new dataset")
@@ -61,73 +107,256 @@ def new(args):
     create(args.repos.path, args.args[0])
 
 
-@command(name='check', usage="checks datasets")
+@command(name='check', usage="checks datasets [--format table|jsonl|csv] [--profile] [--profile-memory] [--trace FILE]")
 def check(args):
-    rows = []
-    for ds in sorted(args.repos.datasets):
-        errors = args.repos.datasets[ds].check()
-        errors = CHECKMARK if not errors else ", ".join(sorted(errors))
-        rows.append([ds, errors])
-    print(tabulate(rows, headers=['Dataset', 'Errors'], tablefmt="github"))
+    from .output import get_writer
+    parser = CommandParser(prog='check')
+    add_format_option(parser)
+    add_profile_options(parser)
+    opts = parser.parse_args(args.args)
+    profiler = get_profiler(opts)
+    
+    def iter_errors():
+        if profiler:
+            for ds in sorted(args.repos.datasets):
+                args.repos.datasets[ds].profiler = profiler
+                yield (ds, args.repos.datasets[ds].check())
+        else:
+            for ds, record in args.repos.iter_records():
+                yield (ds, record.errors)
+    
+    def render(record):
+        return [record['dataset'], ", ".join(record['errors']) or CHECKMARK]
+    
+    with get_writer(opts.format, ['dataset', 'errors'], headers=['Dataset', 'Errors'], render=render) as writer:
+        for ds, errors in iter_errors():
+            writer.write({'dataset': ds, 'errors': sorted(errors)})
+    report_profile(profiler, opts)
 
 
-@command(name='validate', usage="runs validation")
+@command(
+    name='validate',
+    usage="runs validation [--jobs N] [--force] [--support P] [--glottolog FILE] [--topologies] [--format table|jsonl|csv] "
+          "[--profile] [--profile-memory] [--trace FILE] [dataset ...]")
 def validate(args):
-    to_validate = args.repos.datasets
-    if len(args.args):
-        to_validate = [ds for ds in to_validate if ds in args.args]
-
-    for ds in sorted(to_validate):
-        with warnings.catch_warnings(record=True) as warned:
-            warnings.simplefilter("always")
-            args.repos.datasets[ds].validate()
-            if not warned:
-                print("%s %s" % (CHECKMARK, ds))
-            else:
-                print("%s %s" % (ERROR, ds))
-                for w in warned:
-                    print("\t%s" % w.message)
+    parser = CommandParser(prog='validate')
+    parser.add_argument('--jobs', type=int, default=1, help="number of worker processes")
+    parser.add_argument(
+        '--force', action='store_true', help="revalidate datasets with unchanged inputs")
+    parser.add_argument(
+        '--support', type=float,
+        help="report summary tree clades with lower posterior support than this")
+    parser.add_argument(
+        '--glottolog', help="check taxa.csv codes against this Glottolog snapshot (csv)")
+    parser.add_argument(
+        '--topologies', action='store_true', help="report the distinct topologies in the posterior")
+    add_format_option(parser)
+    add_profile_options(parser)
+    parser.add_argument('dataset', nargs='*')
+    opts = parser.parse_args(args.args)
+    profiler = get_profiler(opts)
+    
+    names = opts.dataset or None
+    validated = args.repos.validate_all(
+        names, jobs=opts.jobs, force=opts.force, profiler=profiler, support=opts.support,
+        glottolog=opts.glottolog, topologies=opts.topologies)
+    from . import validation
+    if opts.format == 'table':
+        for ds, results in validated:
+            print("%s %s" % (ERROR if validation.failures(results) else CHECKMARK, ds))
+            if results:
+                for r in results:
+                    print("\t%s" % r.message)
                 print()
-            
+            sys.stdout.flush()
+    else:
+        from .output import get_writer
+        fields = ['dataset', 'valid', 'errors', 'warnings', 'messages']
+        with get_writer(opts.format, fields) as writer:
+            for ds, results in validated:
+                writer.write({
+                    'dataset': ds,
+                    'valid': not validation.failures(results),
+                    'errors': sum(1 for r in results if r.severity == validation.ERROR),
+                    'warnings': sum(1 for r in results if r.severity == validation.WARNING),
+                    'messages': [r.message for r in results],
+                })
+    report_profile(profiler, opts)
 
 
-@command(name='dplace', usage="prints out DPLACE index.csv information")
+@command(name='dplace', usage="prints out DPLACE index.csv information: --all | dataset ...")
 def dplace(args):
-    import sys, csv
+    import csv
     
-    if len(args.args) != 1:
-        raise ParserError("need a dataset name")
+    parser = CommandParser(prog='dplace')
+    parser.add_argument('--all', action='store_true', help="export every dataset")
+    parser.add_argument('dataset', nargs='*')
+    opts = parser.parse_args(args.args)
+    if not opts.all and not opts.dataset:
+        raise ParserError("need a dataset name or --all")
+    
+    names = sorted(args.repos.datasets) if opts.all else opts.dataset
+    for name in names:
+        assert name in args.repos.datasets, "Unknown dataset %s" % name
+    
+    if opts.all:  # one pass over the index
+        records = args.repos.iter_records()
+    else:  # without checking the other datasets
+        records = ((name, args.repos.record(name)) for name in names)
+    counts = args.repos.count_trees(names)
     
-    ds = args.repos.datasets.get(args.args[0])
-    assert ds is not None, "Unknown dataset %s" % args.args[0]
     writer = csv.writer(sys.stdout)
-    writer.writerow(['id', 'name', 'author', 'year', 'scaling', 'reference', 'url'])
     writer.writerow([
-        ds.details.get('id', ''),
-        ds.details.get('name', ''),
-        ds.details.get('author', ''),
-        ds.details.get('year', ''),
-        ds.details.get('scaling', ''),
-        ds.details.get('reference', ''),
-        ds.details.get('url', ''),
+        'id', 'name', 'author', 'year', 'scaling', 'reference', 'url',
+        'taxa', 'summary_trees', 'posterior_trees',
     ])
+    for name, record in records:
+        ntrees = counts[name]
+        writer.writerow([
+            record.details.get('id', ''),
+            record.details.get('name', ''),
+            record.details.get('author', ''),
+            record.details.get('year', ''),
+            record.details.get('scaling', ''),
+            record.details.get('reference', ''),
+            record.details.get('url', ''),
+            len(record.taxa),
+            ntrees['summary'] if ntrees['summary'] is not None else '',
+            ntrees['posterior'] if ntrees['posterior'] is not None else '',
+        ])
+        sys.stdout.flush()
+
+
+@command(name='export', usage="exports the repository metadata: --sqlite FILE | --csv DIR")
+def export(args):
+    parser = CommandParser(prog='export')
+    parser.add_argument('--sqlite', help="write the tables to this SQLite database")
+    parser.add_argument('--csv', help="write the tables as csv files to this directory")
+    opts = parser.parse_args(args.args)
+    if not opts.sqlite and not opts.csv:
+        raise ParserError("need --sqlite FILE or --csv DIR")
+    
+    from .export import get_tables, write_sqlite, write_csv
+    tables = get_tables(args.repos)
+    if opts.sqlite:
+        write_sqlite(tables, opts.sqlite)
+        print("wrote %d datasets to %s" % (len(tables['datasets']), opts.sqlite))
+    if opts.csv:
+        write_csv(tables, opts.csv)
+        print("wrote %d datasets to %s" % (len(tables['datasets']), opts.csv))
+
+
+@command(name='build', usage="runs the Makefiles of stale datasets [--jobs N] [--force] [--dry-run] [dataset ...]")
+def build(args):
+    import time
+    from .build import build as build_datasets, is_stale
+    
+    parser = CommandParser(prog='build')
+    parser.add_argument('--jobs', type=int, default=1, help="number of Makefiles to run at once")
+    parser.add_argument('--force', action='store_true', help="run the Makefiles of up to date datasets")
+    parser.add_argument('--dry-run', action='store_true', help="only list the datasets to build")
+    parser.add_argument('dataset', nargs='*')
+    opts = parser.parse_args(args.args)
+    
+    for name in opts.dataset:
+        assert name in args.repos.datasets, "Unknown dataset %s" % name
+    stale = {
+        name: ds for name, ds in sorted(args.repos.datasets.items())
+        if (not opts.dataset or name in opts.dataset) and ds.makefile and (opts.force or is_stale(ds))
+    }
+    if opts.dry_run or not stale:
+        for name in stale:
+            print(name)
+        print("%d datasets to build" % len(stale))
+        return
+    
+    def log(name, line):
+        print("[%s] %s" % (name, line))
+        sys.stdout.flush()
+    
+    start, failed = time.perf_counter(), 0
+    for result in build_datasets(stale, jobs=opts.jobs, log=log):
+        ds = stale[result.dataset]
+        ds.refresh()
+        errors = ds.check()
+        if result.returncode:
+            failed += 1
+            status = "%s %s: make failed (exit %d)" % (ERROR, result.dataset, result.returncode)
+        elif errors:
+            status = "%s %s: missing %s" % (ERROR, result.dataset, ", ".join(sorted(errors)))
+        else:
+            status = "%s %s" % (CHECKMARK, result.dataset)
+        print("%s in %.1fs" % (status, result.seconds))
+        sys.stdout.flush()
+    print("built %d datasets (%d failed) in %.1fs" % (len(stale), failed, time.perf_counter() - start))
+    if failed:
+        sys.exit(1)
+
+
+@command(
+    name='thin',
+    usage="subsamples posterior.trees: <dataset> [--burnin N|N%] [--sample N] [--seed N] [--output FILE]")
+def thin(args):
+    parser = CommandParser(prog='thin')
+    parser.add_argument('dataset')
+    parser.add_argument('--burnin', default='0', help="number (or percentage) of trees to discard")
+    parser.add_argument('--sample', type=int, help="number of trees to keep")
+    parser.add_argument('--seed', type=int, help="sample at random with this seed, not evenly")
+    parser.add_argument('--output', help="file to write (default: posterior.thinned.trees)")
+    opts = parser.parse_args(args.args)
+    
+    ds = args.repos.datasets.get(opts.dataset)
+    assert ds is not None, "Unknown dataset %s" % opts.dataset
+    if not ds.posterior:
+        raise ParserError("%s has no posterior.trees" % opts.dataset)
+    
+    from .trees import thin as thin_trees
+    output = Path(opts.output) if opts.output else ds.dirname / 'posterior.thinned.trees'
+    try:
+        n = thin_trees(ds.posterior, output, burnin=opts.burnin, sample=opts.sample, seed=opts.seed)
+    except ValueError as e:
+        raise ParserError(str(e))
+    print("wrote %d trees to %s" % (n, output))
+
+
+@command(
+    name='topologies',
+    usage="counts the distinct topologies in posterior.trees: <dataset> [--digits N] [--top N] [--output FILE]")
+def topologies(args):
+    parser = CommandParser(prog='topologies')
+    parser.add_argument('dataset')
+    parser.add_argument(
+        '--digits', type=int, help="also distinguish branch lengths rounded to this many digits")
+    parser.add_argument('--top', type=int, default=10, help="number of topologies to list")
+    parser.add_argument('--output', help="write the distinct trees, weighted by frequency, to this file")
+    opts = parser.parse_args(args.args)
+    
+    ds = args.repos.datasets.get(opts.dataset)
+    assert ds is not None, "Unknown dataset %s" % opts.dataset
+    if not ds.posterior:
+        raise ParserError("%s has no posterior.trees" % opts.dataset)
+    
+    from .bipartitions import TopologyCounts, deduplicate
+    if opts.output:
+        counts = deduplicate(ds.posterior, Path(opts.output), digits=opts.digits)
+    elif opts.digits is None:
+        counts = ds.topologies
+    else:
+        counts = TopologyCounts.from_file(ds.posterior, digits=opts.digits)
+    
+    from tabulate import tabulate
+    rows = [[t[:12], n, "%.4f" % f] for t, n, f in counts.frequencies()[:opts.top]]
+    print(tabulate(rows, headers=['Topology', 'Trees', 'Frequency'], tablefmt="github"))
+    print()
+    print("%d distinct topologies in %d trees" % (len(counts), counts.ntrees))
+    if opts.output:
+        print("wrote %d trees to %s" % (len(counts), opts.output))
 
 
 @command(name='beast2chars', usage="prints out a character block from a beast2 XML file")
 def beast2chars(args):
-    import xml.etree.ElementTree as ElementTree
-
-    def find_filter(node):  # note recursive
-        for child in node:
-            find_filter(child)
-            (p, x, y) = get_partition(node)
-            if p and x and y:
-                return (p, x, y)
-
-    def get_partition(p):
-        x, y = [int(_) for _ in p.get('filter').split("-")]
-        return (p.get('id'), x, y)
-        
+    from .beast import iter_partitions
+    
     def printchar(p, x, y, ascertained=False):
         n = 1
         for i in range(x, y + 1):
@@ -135,30 +364,11 @@ def beast2chars(args):
             print(i, label)
             n += 1
     
-    def get_by_id(data_id):
-        if data_id.startswith("@"):
-            data_id = data_id.lstrip("@")
-        return xml.find(".//alignment[@id='%s']" % data_id)
-        
-    
     if len(args.args) != 1:
         raise ParserError("need an XML filename")
     
-    xml = ElementTree.parse(args.args[0])
-    
-    for treelh in xml.findall(".//distribution[@spec='TreeLikelihood']"):
-        if treelh.get('data'):
-            data = get_by_id(treelh.get('data'))
-            ascertained = data.get('ascertained') == 'true'
-            printchar(*get_partition(data.find('./data')), ascertained=ascertained)
-        else:
-            data = treelh.find('./data')
-            ascertained = data.get('ascertained') == 'true'
-            if data.get('data'):
-                datadata = get_by_id(data.get('data'))
-            else:
-                datadata = treelh.find('./data/data')
-            printchar(*get_partition(datadata), ascertained=ascertained)
+    for p, x, y, ascertained in iter_partitions(args.args[0]):
+        printchar(p, x, y, ascertained=ascertained)
 
 
 @command(name='itemise', usage="lists all the values for a given item")
@@ -166,61 +376,100 @@ def itemise(args):
     if len(args.args) != 1:
         raise ParserError("need a value to itemise")
     
-    for ds in sorted(args.repos.datasets):
-        d = args.repos.datasets[ds]
+    for ds in sorted(args.repos.records):
+        record = args.repos.records[ds]
         
-        try:
-            dvalue = getattr(d, args.args[0])
-        except AttributeError:
-            dvalue = d.details.get(args.args[0], None)
+        if args.args[0] in record.details:
+            dvalue = record.details[args.args[0]]
+        else:
+            dvalue = getattr(args.repos.datasets[ds], args.args[0], None)
             
         print("%s = %s" % (ds.ljust(40), dvalue))
 
 
 
-@command(name='readme', usage="makes a readme.md file")
-def readme(args):
-    if len(args.args) != 1:
-        raise ParserError("need a dataset name")
-    
-    def fmt(x):
-        template = "[%(var)s](%(var)s)"
-        if x is None:  # pragma: no cover
-            return None
-        elif isinstance(x, Path):
-            return template % {'var': x.relative_to(ds.dirname)}
-        else:
-            return template % {'var': x}
+@command(name='taxa', usage="finds taxa across datasets: --<field> VALUE | --shared [FIELD]")
+def taxa(args):
+    from .taxonindex import FIELDS
+    parser = CommandParser(prog='taxa')
+    query = parser.add_mutually_exclusive_group(required=True)
+    for field in FIELDS:
+        query.add_argument('--%s' % field, help="find the rows with this %s" % field)
+    query.add_argument(
+        '--shared', nargs='?', const='taxon', choices=FIELDS,
+        help="list the values of a field (default: taxon) found in more than one dataset")
+    opts = parser.parse_args(args.args)
     
-    ds = args.repos.datasets.get(args.args[0])
-    assert ds is not None, "Unknown dataset %s" % args.args[0]
-    
-    nchar = ""
-    if ds.characters:
-        nchar = "%d characters - " % len(ds.characters.read_text().split("\n"))
-    
-    print(dedent(f"""\
-    # {ds.details['name']}:
+    from tabulate import tabulate
+    index = args.repos.taxon_index
+    if opts.shared:
+        shared = index.shared(opts.shared)
+        rows = [[value, len(shared[value]), ", ".join(shared[value])] for value in sorted(shared)]
+        print(tabulate(rows, headers=[opts.shared, 'N', 'Datasets'], tablefmt="github"))
+    else:
+        field = [f for f in FIELDS if getattr(opts, f)][0]
+        rows = [
+            [dataset] + [row.get(f, '') for f in FIELDS]
+            for dataset, row in index.lookup(field, getattr(opts, field))
+        ]
+        print(tabulate(rows, headers=['Dataset'] + FIELDS, tablefmt="github"))
+
+
+@command(name='watch', usage="re-checks datasets as they change [--interval S] [--no-validate] [dataset ...]")
+def watch(args):
+    import time
+    from .watch import Watcher
     
-    ```
-    {ds.details['reference']}
-    ```
+    parser = CommandParser(prog='watch')
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between polls")
+    parser.add_argument('--no-validate', action='store_true', help="only run check, not validate")
+    parser.add_argument('dataset', nargs='*')
+    opts = parser.parse_args(args.args)
     
-    * ID: {ds.details['id']}:
-    * URL: {fmt(ds.details['url'])}
-    * Paper: {fmt(ds.dirname / 'paper')}
-    * Original Files: {fmt(ds.dirname / 'original')}
-    * Scaling: {ds.details['scaling']}
-    * Taxa: {len(ds.taxa)} taxa 
-    * Data: {fmt(ds.dirname / 'data')}
-    * Nexus: {fmt(ds.nexus)}
-    * Character Specification: {nchar}{fmt(ds.characters)}
-    * Summary Tree: {fmt(ds.summary)}
-    * Posterior Probability Distribution: {fmt(ds.posterior)}
+    watcher = Watcher(args.repos, names=opts.dataset, validate=not opts.no_validate)
+    try:
+        while True:
+            for ds, added, removed in watcher.poll():
+                print("%s %s" % (ERROR if watcher.failed(ds) else CHECKMARK, ds))
+                for problem in added:
+                    print("\t+ %s" % problem)
+                for problem in removed:
+                    print("\t- %s" % problem)
+                sys.stdout.flush()
+            time.sleep(opts.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+@command(name='readme', usage="makes readme.md files: [--all] [--write] [--jobs N] [dataset ...]")
+def readme(args):
+    parser = CommandParser(prog='readme')
+    parser.add_argument('--all', action='store_true', help="make the readme of every dataset")
+    parser.add_argument(
+        '--write', action='store_true', help="write README.md files (if changed) instead of printing")
+    parser.add_argument('--jobs', type=int, default=1, help="number of worker processes")
+    parser.add_argument('dataset', nargs='*')
+    opts = parser.parse_args(args.args)
+    if not opts.all and not opts.dataset:
+        raise ParserError("need a dataset name or --all")
     
-    ## Errors:
-    """))
+    names = sorted(args.repos.datasets) if opts.all else opts.dataset
+    for name in names:
+        assert name in args.repos.datasets, "Unknown dataset %s" % name
     
-    for e in ds.check():  # pragma: no cover
-        print("* missing %s" % e)
+    if not opts.write:
+        from .readme import render
+        for name in names:
+            print(render(args.repos.datasets[name]), end='')
+        return
     
+    from .api import run_jobs
+    from .readme import README, write_readme
+    dirnames = [args.repos.datasets[n].dirname for n in names]
+    written = 0
+    for dirname, changed in zip(dirnames, run_jobs(write_readme, dirnames, opts.jobs)):
+        if changed:
+            written += 1
+            print("wrote %s" % (dirname / README))
+            sys.stdout.flush()
+    print("%d of %d README files changed" % (written, len(names)))
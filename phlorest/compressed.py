@@ -0,0 +1,65 @@
+# coding=utf-8
+"""
+Support for compressed tree and nexus files.
+
+`summary.trees`, `posterior.trees` and `data.nex` may be stored gzip, bzip2
+or xz compressed (e.g. `posterior.trees.gz`). Files are decompressed as they
+are streamed, never to a temporary copy.
+"""
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+SUFFIXES = ['.gz', '.bz2', '.xz']
+
+
+def _opener(suffix):
+    if suffix == '.gz':
+        import gzip
+        return gzip.open
+    elif suffix == '.bz2':
+        import bz2
+        return bz2.open
+    elif suffix == '.xz':
+        import lzma
+        return lzma.open
+    return open
+
+
+def is_compressed(path):
+    return Path(path).suffix in SUFFIXES
+
+
+def uncompressed(path):
+    """Returns `path` without any compression suffix"""
+    path = Path(path)
+    return path.with_suffix('') if is_compressed(path) else path
+
+
+def variants(filename):
+    """Returns the names `filename` may be stored as, uncompressed first"""
+    return [filename] + [filename + s for s in SUFFIXES]
+
+
+def open_text(path, mode='r'):
+    """Opens `path` in text mode, (de)compressing according to its suffix"""
+    return _opener(Path(path).suffix)(str(path), mode + 't', encoding='utf8')
+
+
+@contextmanager
+def open_replacing(path):
+    """
+    Like `open_text(path, 'w')`, but writes to a temporary file next to `path`
+    which only replaces `path` once it is complete. So `path` can be read
+    while it is being rewritten, and is left alone if writing fails.
+    """
+    path = Path(path)
+    tmp = path.parent / ('.%s.tmp%s' % (path.name, path.suffix))  # same suffix, same compression
+    try:
+        with open_text(tmp, 'w') as handle:
+            yield handle
+        os.replace(str(tmp), str(path))
+    except BaseException:
+        if tmp.exists():
+            tmp.unlink()
+        raise
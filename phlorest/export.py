@@ -0,0 +1,135 @@
+# coding=utf-8
+"""
+Exports the metadata of every dataset in a repository as a set of tables,
+either to a SQLite database or to a directory of csv files (one per table).
+
+The rows come from the repository index, so an export of an unchanged
+repository does not parse any details.txt or taxa.csv again.
+"""
+import csv
+import json
+from pathlib import Path
+
+from .taxonindex import FIELDS
+
+TABLES = {
+    'datasets': ['name', 'path', 'id', 'scaling', 'ntaxa', 'summary_trees', 'posterior_trees'],
+    'details': ['dataset', 'key', 'value'],
+    'taxa': ['dataset'] + FIELDS,
+    'files': ['dataset', 'file', 'present'],
+    'trees': ['dataset', 'kind', 'path', 'ntrees'],
+}
+
+SCHEMA = """
+CREATE TABLE datasets (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    id TEXT,
+    scaling TEXT,
+    ntaxa INTEGER NOT NULL,
+    summary_trees INTEGER,
+    posterior_trees INTEGER
+);
+CREATE TABLE details (
+    dataset TEXT NOT NULL REFERENCES datasets(name),
+    key TEXT NOT NULL,
+    value TEXT
+);
+CREATE TABLE taxa (
+    dataset TEXT NOT NULL REFERENCES datasets(name),
+    taxon TEXT NOT NULL,
+    isocode TEXT,
+    glottocode TEXT,
+    xd_ids TEXT,
+    soc_ids TEXT
+);
+CREATE TABLE files (
+    dataset TEXT NOT NULL REFERENCES datasets(name),
+    file TEXT NOT NULL,
+    present INTEGER NOT NULL
+);
+CREATE TABLE trees (
+    dataset TEXT NOT NULL REFERENCES datasets(name),
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    ntrees INTEGER NOT NULL
+);
+"""
+
+# created after the rows are inserted, which is faster than updating them row by row.
+INDEXES = """
+CREATE UNIQUE INDEX details_dataset ON details(dataset, key);
+CREATE INDEX details_key ON details(key, value);
+CREATE INDEX taxa_dataset ON taxa(dataset);
+CREATE INDEX taxa_taxon ON taxa(taxon);
+CREATE INDEX taxa_isocode ON taxa(isocode);
+CREATE INDEX taxa_glottocode ON taxa(glottocode);
+CREATE UNIQUE INDEX files_dataset ON files(dataset, file);
+CREATE UNIQUE INDEX trees_dataset ON trees(dataset, kind);
+"""
+
+
+def format_value(value):
+    """Returns a details.txt value as text, with lists and mappings as JSON"""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def get_tables(repos):
+    """Returns {table: [row, ...]} for the datasets in `repos`"""
+    tables = {name: [] for name in TABLES}
+    for name, record in repos.iter_records():
+        dataset = repos.datasets[name]
+        ntrees = repos.tree_counts(name)
+        tables['datasets'].append([
+            name, str(record.path), format_value(record.details.get('id')),
+            format_value(record.details.get('scaling')), len(record.taxa),
+            ntrees['summary'], ntrees['posterior'],
+        ])
+        tables['details'].extend(
+            [name, key, format_value(value)] for key, value in sorted(record.details.items())
+        )
+        tables['taxa'].extend(
+            [name] + [row.get(f) or None for f in FIELDS] for row in record.taxa.values()
+        )
+        tables['files'].extend([name, f, int(present)] for f, present in sorted(record.files.items()))
+        for kind in ('summary', 'posterior'):
+            if ntrees[kind] is not None:
+                path = getattr(dataset, kind).relative_to(dataset.dirname)
+                tables['trees'].append([name, kind, str(path), ntrees[kind]])
+    return tables
+
+
+def write_sqlite(tables, path):
+    """Writes `tables` to a new SQLite database `path` in a single transaction"""
+    import sqlite3
+    path = Path(path)
+    if path.exists():
+        path.unlink()
+    db = sqlite3.connect(str(path))
+    try:
+        with db:
+            db.executescript(SCHEMA)
+            for table, columns in TABLES.items():
+                db.executemany(
+                    "INSERT INTO %s VALUES (%s)" % (table, ", ".join("?" for _ in columns)),
+                    tables[table]
+                )
+            for statement in INDEXES.strip().splitlines():
+                db.execute(statement)
+    finally:
+        db.close()
+
+
+def write_csv(tables, dirname):
+    """Writes each of `tables` to `<dirname>/<table>.csv`"""
+    dirname = Path(dirname)
+    dirname.mkdir(parents=True, exist_ok=True)
+    for table, columns in TABLES.items():
+        with (dirname / ('%s.csv' % table)).open('w', encoding='utf8', newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(columns)
+            writer.writerows(tables[table])
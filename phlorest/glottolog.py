@@ -0,0 +1,157 @@
+# coding=utf-8
+"""
+Checks the isocodes and glottocodes in taxa.csv against an offline snapshot
+of Glottolog.
+
+The snapshot is a csv file with one row per languoid, e.g. Glottolog's
+`languoid.csv` or the `languages.csv` of glottolog-cldf. It is compiled once
+into two dictionaries, {glottocode: (isocode, retired, replacement)} and
+{isocode: [glottocode, ...]}, which is stored in a sidecar next to the
+snapshot and reused until the snapshot changes.
+"""
+import os
+import re
+import csv
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from .taxonindex import split_values
+
+GLOTTOCODE = re.compile(r"^[a-z0-9]{4}[0-9]{4}$")
+ISOCODE = re.compile(r"^[a-z]{3}$")
+
+# the column names used for each value in known snapshot formats.
+COLUMNS = {
+    'glottocode': ['glottocode', 'id'],
+    'isocode': ['isocode', 'iso639p3code', 'iso'],
+    'retired': ['retired', 'bookkeeping'],
+    'replacement': ['replacement', 'replaced_by'],
+}
+TRUE = {'true', 'yes', '1', 't', 'y'}
+
+
+def sidecar(path):
+    """Returns the path of the compiled lookup for the snapshot `path`"""
+    path = Path(path)
+    return path.parent / ('.%s.json' % path.name)
+
+
+def find_columns(header):
+    columns = {}
+    lower = [h.strip().lower() for h in header]
+    for key, names in COLUMNS.items():
+        for name in names:
+            if name in lower:
+                columns[key] = lower.index(name)
+                break
+    if 'glottocode' not in columns:
+        raise ValueError("No glottocode column in Glottolog snapshot")
+    return columns
+
+
+class Glottolog:
+    def __init__(self, languoids, isocodes=None, stamp=None):
+        self.languoids = languoids  # {glottocode: [isocode, retired, replacement]}
+        self.isocodes = isocodes
+        if self.isocodes is None:
+            self.isocodes = {}
+            for glottocode, (isocode, _, _) in sorted(languoids.items()):
+                if isocode:
+                    self.isocodes.setdefault(isocode, []).append(glottocode)
+        self.stamp = stamp
+
+    def __repr__(self):
+        return '<Glottolog snapshot of %d languoids>' % len(self.languoids)
+
+    @classmethod
+    def compile(cls, path):
+        """Reads the snapshot csv file `path`"""
+        languoids = {}
+        with Path(path).open('r', encoding='utf8') as handle:
+            reader = csv.reader(handle)
+            columns = find_columns(next(reader))
+
+            def get(row, key):
+                if key in columns and columns[key] < len(row):
+                    return row[columns[key]].strip()
+                return ''
+
+            for row in reader:
+                glottocode = get(row, 'glottocode')
+                if glottocode:
+                    languoids[glottocode] = [
+                        get(row, 'isocode') or None,
+                        get(row, 'retired').lower() in TRUE,
+                        get(row, 'replacement') or None,
+                    ]
+        stat = os.stat(str(path))
+        return cls(languoids, stamp=[stat.st_mtime_ns, stat.st_size])
+
+    @classmethod
+    def from_file(cls, path):
+        """Returns the lookup for the snapshot `path`, compiling and storing it if needed"""
+        stat = os.stat(str(path))
+        try:
+            with sidecar(path).open('r', encoding='utf8') as handle:
+                stored = json.load(handle)
+            if stored['stamp'] == [stat.st_mtime_ns, stat.st_size]:
+                return cls(stored['languoids'], stored['isocodes'], stored['stamp'])
+        except (OSError, ValueError, KeyError):
+            pass
+        glottolog = cls.compile(path)
+        try:
+            with sidecar(path).open('w', encoding='utf8') as handle:
+                json.dump({
+                    'stamp': glottolog.stamp,
+                    'languoids': glottolog.languoids,
+                    'isocodes': glottolog.isocodes,
+                }, handle)
+        except OSError:  # pragma: no cover
+            pass
+        return glottolog
+
+    def check(self, taxa):
+        """
+        Checks the `taxa` ({taxon: row}) of a dataset, returning a list of
+        (problem, [taxon, ...]) with the problems 'invalid glottocodes',
+        'unknown glottocodes', 'retired glottocodes', 'invalid isocodes',
+        'unknown isocodes' and 'mismatched isocodes and glottocodes'.
+        """
+        problems = {}
+
+        def add(problem, item):
+            problems.setdefault(problem, []).append(item)
+
+        for taxon, row in taxa.items():
+            glottocodes = split_values('glottocode', row.get('glottocode'))
+            isocodes = split_values('isocode', row.get('isocode'))
+            known = []
+            for glottocode in glottocodes:
+                if not GLOTTOCODE.match(glottocode):
+                    add('invalid glottocodes', "%s (%s)" % (taxon, glottocode))
+                elif glottocode not in self.languoids:
+                    add('unknown glottocodes', "%s (%s)" % (taxon, glottocode))
+                else:
+                    _, retired, replacement = self.languoids[glottocode]
+                    if retired:
+                        add('retired glottocodes', "%s (%s%s)" % (
+                            taxon, glottocode, ' -> %s' % replacement if replacement else ''))
+                    known.append(glottocode)
+            for isocode in isocodes:
+                if not ISOCODE.match(isocode):
+                    add('invalid isocodes', "%s (%s)" % (taxon, isocode))
+                elif isocode not in self.isocodes:
+                    add('unknown isocodes', "%s (%s)" % (taxon, isocode))
+                else:  # dialects have no isocode of their own, so only compare those given
+                    expected = {self.languoids[g][0] for g in known if self.languoids[g][0]}
+                    if expected and isocode not in expected:
+                        add('mismatched isocodes and glottocodes', "%s (%s/%s)" % (
+                            taxon, isocode, ",".join(known)))
+        return sorted(problems.items())
+
+
+@lru_cache(maxsize=None)
+def get_glottolog(path):
+    """Returns the `Glottolog` lookup for `path`, loading it once per process"""
+    return Glottolog.from_file(path)
@@ -0,0 +1,218 @@
+# coding=utf-8
+"""
+A persistent index of the datasets in a repository.
+
+Parsing every `details.txt` and `taxa.csv` on each invocation is slow on
+large repositories, so the results of `Phlorest.check` and the parsed
+metadata are stored in a SQLite file, keyed by a fingerprint of the file
+stats they were computed from. Only datasets whose fingerprint changed are
+parsed again.
+"""
+import os
+import json
+from pathlib import Path
+
+from .phlorest import FILES
+from .trees import scan_trees
+
+# files whose contents (and not just presence) feed into an index record.
+INDEXED_FILES = ['details.txt', 'taxa.csv', 'source.bib']
+# subdirectories that `check` requires to be non-empty.
+INDEXED_DIRS = ['original', 'paper', 'data']
+# the version of `Phlorest.check` and of the records, part of each fingerprint
+# so that records of an older version are computed again. Bump it when they change.
+VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    details TEXT NOT NULL,
+    taxa TEXT NOT NULL,
+    files TEXT NOT NULL,
+    errors TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trees (
+    path TEXT PRIMARY KEY,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    ntrees INTEGER NOT NULL
+);
+"""
+
+
+def fingerprint(dirname):
+    """
+    Returns a string identifying the state of the dataset in `dirname`.
+
+    The directory mtimes change when files are added or removed, and the
+    mtime and size of the indexed files change when they are edited.
+    """
+    parts = ['v%d' % VERSION]
+    for name in [''] + INDEXED_DIRS + INDEXED_FILES:
+        try:
+            stat = os.stat(os.path.join(str(dirname), name))
+            parts.append('%s:%d:%d' % (name, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            parts.append('%s:-' % name)
+    return '|'.join(parts)
+
+
+class DatasetRecord:
+    """The indexed metadata and check status of a single dataset"""
+    def __init__(self, name, path, details, taxa, files, errors):
+        self.name = name
+        self.path = Path(path)
+        self.details = details
+        self.taxa = taxa
+        self.files = files
+        self.errors = errors
+
+    def __repr__(self):
+        return '<DatasetRecord %s>' % self.name
+
+    @classmethod
+    def from_dataset(cls, name, dataset):
+        errors = dataset.check()
+        return cls(
+            name=name,
+            path=dataset.dirname,
+            details=dataset.details,
+            taxa=dataset.taxa,
+            files={f: f not in errors for f in FILES},
+            errors=errors,
+        )
+
+
+class RepositoryIndex:
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def __repr__(self):
+        return '<RepositoryIndex %s>' % self.path
+
+    def connect(self):
+        import sqlite3
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.path))
+        db.executescript(SCHEMA)
+        return db
+
+    def read(self):
+        """Returns the stored records as {name: (fingerprint, DatasetRecord)}"""
+        if not self.path.exists():
+            return {}
+        db = self.connect()
+        try:
+            rows = db.execute(
+                "SELECT name, path, fingerprint, details, taxa, files, errors FROM datasets"
+            ).fetchall()
+        finally:
+            db.close()
+        return {
+            name: (fp, DatasetRecord(
+                name, path, json.loads(details), json.loads(taxa),
+                json.loads(files), json.loads(errors)
+            ))
+            for name, path, fp, details, taxa, files, errors in rows
+        }
+
+    def get(self, name, dataset):
+        """
+        Returns the current record of the single dataset `name` (a `Phlorest`),
+        reading it from the index if unchanged and storing it otherwise.
+        """
+        fp = fingerprint(dataset.dirname)
+        db = self.connect()
+        try:
+            row = db.execute(
+                "SELECT path, details, taxa, files, errors FROM datasets "
+                "WHERE name = ? AND fingerprint = ?", (name, fp)
+            ).fetchone()
+            if row:
+                path, details, taxa, files, errors = row
+                return DatasetRecord(
+                    name, path, json.loads(details), json.loads(taxa),
+                    json.loads(files), json.loads(errors)
+                )
+            record = DatasetRecord.from_dataset(name, dataset)
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?)", (
+                        record.name, str(record.path), fp,
+                        json.dumps(record.details, default=str), json.dumps(record.taxa),
+                        json.dumps(record.files), json.dumps(record.errors)
+                    )
+                )
+            return record
+        finally:
+            db.close()
+
+    def update(self, datasets):
+        """
+        Brings the index up to date with `datasets` ({name: Phlorest}) and
+        returns the current records as {name: DatasetRecord}.
+        """
+        return dict(self.iter_update(datasets))
+
+    def iter_update(self, datasets):
+        """
+        Yields (name, DatasetRecord) for `datasets` ({name: Phlorest}) in sorted
+        order as each record is read or recomputed. The changes are written
+        to the index in one transaction when the iteration ends.
+        """
+        stored = self.read()
+        changed = []
+        try:
+            for name in sorted(datasets):
+                fp = fingerprint(datasets[name].dirname)
+                if name in stored and stored[name][0] == fp:
+                    yield (name, stored[name][1])
+                else:
+                    record = DatasetRecord.from_dataset(name, datasets[name])
+                    changed.append((fp, record))
+                    yield (name, record)
+        finally:
+            removed = [name for name in stored if name not in datasets]
+            if changed or removed or not self.path.exists():
+                db = self.connect()
+                try:
+                    with db:
+                        db.executemany(
+                            "INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            [(
+                                r.name, str(r.path), fp,
+                                json.dumps(r.details, default=str), json.dumps(r.taxa),
+                                json.dumps(r.files), json.dumps(r.errors)
+                            ) for fp, r in changed]
+                        )
+                        db.executemany("DELETE FROM datasets WHERE name = ?", [(n,) for n in removed])
+                finally:
+                    db.close()
+
+    def ntrees(self, paths):
+        """
+        Returns {path: number of trees} for the tree files in `paths`, only
+        counting the trees in files that changed since they were last counted.
+        """
+        db = self.connect()
+        try:
+            counts, changed = {}, []
+            for path in paths:
+                stat = os.stat(str(path))
+                row = db.execute(
+                    "SELECT ntrees FROM trees WHERE path = ? AND mtime = ? AND size = ?",
+                    (str(path), stat.st_mtime_ns, stat.st_size)
+                ).fetchone()
+                if row:
+                    counts[path] = row[0]
+                else:
+                    counts[path] = scan_trees(path).ntrees
+                    changed.append((str(path), stat.st_mtime_ns, stat.st_size, counts[path]))
+            if changed:
+                with db:
+                    db.executemany("INSERT OR REPLACE INTO trees VALUES (?, ?, ?, ?)", changed)
+        finally:
+            db.close()
+        return counts
@@ -0,0 +1,90 @@
+# coding=utf-8
+"""
+A manifest of content hashes of the files `Phlorest.validate` reads, along
+with the results of the last validation. Datasets whose inputs hash the same
+as last time do not need to be validated again. A manifest written by a
+different version of the checks is discarded.
+"""
+import os
+import json
+import hashlib
+from pathlib import Path
+
+from .compressed import variants
+from .validation import Result, VERSION
+
+# the files that validation depends on.
+INPUTS = [
+    'details.txt', 'taxa.csv', 'data.nex', 'characters.csv',
+    'summary.trees', 'posterior.trees', 'source.bib',
+]
+# ...and those of them that may be compressed.
+COMPRESSIBLE = ['data.nex', 'summary.trees', 'posterior.trees']
+
+
+def hash_file(path, blocksize=1 << 20):
+    digest = hashlib.sha1()
+    with open(str(path), 'rb') as handle:
+        for block in iter(lambda: handle.read(blocksize), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.datasets = {}
+        if self.path.exists():
+            with self.path.open('r', encoding='utf8') as handle:
+                stored = json.load(handle)
+            if stored.get('version') == VERSION:
+                self.datasets = stored.get('datasets', {})
+
+    def __repr__(self):
+        return '<Manifest %s>' % self.path
+
+    def inputs(self, name, dirname):
+        """
+        Returns {filename: [mtime_ns, size, sha1]} for the inputs of the dataset
+        `name` in `dirname` that exist. Files with the same mtime and size as
+        recorded in the manifest are not hashed again.
+        """
+        known = self.datasets.get(name, {}).get('inputs', {})
+        inputs = {}
+        for filename in (v for f in INPUTS for v in (variants(f) if f in COMPRESSIBLE else [f])):
+            try:
+                stat = os.stat(os.path.join(str(dirname), filename))
+            except FileNotFoundError:
+                continue
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            if known.get(filename) and known[filename][:2] == stamp:
+                inputs[filename] = known[filename]
+            else:
+                inputs[filename] = stamp + [hash_file(Path(dirname) / filename)]
+        return inputs
+
+    def get(self, name, inputs, options=None):
+        """
+        Returns the stored results for `name` if its input hashes match `inputs`
+        and it was validated with the same `options`.
+        """
+        entry = self.datasets.get(name)
+        if not entry or entry.get('options', {}) != (options or {}):
+            return None
+
+        def hashes(i):
+            return {k: v[2] for k, v in i.items()}
+
+        if hashes(entry['inputs']) != hashes(inputs):
+            return None
+        return [Result(*r) for r in entry['results']]
+
+    def set(self, name, inputs, results, options=None):
+        self.datasets[name] = {
+            'inputs': inputs, 'options': options or {}, 'results': [list(r) for r in results]
+        }
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('w', encoding='utf8') as handle:
+            json.dump({'version': VERSION, 'datasets': self.datasets}, handle, indent=1, sort_keys=True)
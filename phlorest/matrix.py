@@ -0,0 +1,172 @@
+# coding=utf-8
+"""
+A compact numpy representation of the character matrix in `data.nex`.
+
+The matrix is held as a taxa x characters array of uint8 state codes, so
+per-character and per-taxon statistics are vectorized operations even for
+matrices of thousands of taxa by tens of thousands of characters.
+
+Requires numpy (`pip install phlorest[matrix]`).
+"""
+import re
+
+import numpy as np
+
+from .compressed import open_text
+from .trees import iter_statements, keyword, strip_comments, unquote
+
+# codes for cells that do not hold an observed state.
+MISSING = 255
+GAP = 254
+POLYMORPHIC = 253
+
+_POLYMORPHISM = re.compile(r"[({][^)}]*[)}]")
+_OPTION = re.compile(r"(missing|gap)\s*=\s*(\S)", re.IGNORECASE)
+
+
+def lookup_table(missing='?', gap='-'):
+    """Returns an array mapping ascii codes to state codes"""
+    table = np.full(256, MISSING, dtype=np.uint8)
+    for i, char in enumerate('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'):
+        table[ord(char)] = i
+        table[ord(char.lower())] = i
+    table[ord(gap)] = GAP
+    table[ord(missing)] = MISSING
+    table[ord('*')] = POLYMORPHIC
+    return table
+
+
+def parse_rows(matrix):
+    """Yields (taxon, sequence) for each row of a nexus MATRIX statement"""
+    body = strip_comments(matrix).strip()[len('matrix'):]
+    for line in body.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("'"):
+            end = line.index("'", 1)
+            while line[end:end + 2] == "''":
+                end = line.index("'", end + 2)
+            taxon, rest = unquote(line[:end + 1]), line[end + 1:]
+        else:
+            taxon, _, rest = line.replace('\t', ' ').partition(' ')
+        yield (taxon, ''.join(rest.split()))
+
+
+class CharacterMatrix:
+    def __init__(self, taxa, matrix):
+        self.taxa = list(taxa)
+        self.matrix = matrix
+
+    def __repr__(self):
+        return '<CharacterMatrix %d taxa x %d characters>' % self.matrix.shape
+
+    @property
+    def ntaxa(self):
+        return self.matrix.shape[0]
+
+    @property
+    def nchar(self):
+        return self.matrix.shape[1]
+
+    @classmethod
+    def from_rows(cls, rows, missing='?', gap='-'):
+        """Builds a matrix from (taxon, sequence) pairs, joining interleaved rows"""
+        table = lookup_table(missing, gap)
+        sequences = {}
+        for taxon, sequence in rows:
+            sequence = _POLYMORPHISM.sub('*', sequence)
+            sequences.setdefault(taxon, []).append(sequence)
+        taxa = list(sequences)
+        encoded = [
+            table[np.frombuffer(''.join(sequences[t]).encode('ascii', 'replace'), dtype=np.uint8)]
+            for t in taxa
+        ]
+        if len({len(e) for e in encoded}) > 1:
+            raise ValueError("Rows in matrix have different lengths")
+        matrix = np.vstack(encoded) if encoded else np.zeros((0, 0), dtype=np.uint8)
+        return cls(taxa, matrix)
+
+    @classmethod
+    def from_handle(cls, handle):
+        """Reads the matrix from the data or characters block of a nexus file"""
+        in_block, missing, gap = False, '?', '-'
+        for statement in iter_statements(handle):
+            word = keyword(statement)
+            if word == 'begin':
+                block = strip_comments(statement).lower().split()[-1]
+                in_block = block in ('data', 'characters')
+            elif word in ('end', 'endblock'):
+                in_block = False
+            elif in_block and word == 'format':
+                options = dict((k.lower(), v) for k, v in _OPTION.findall(statement))
+                missing, gap = options.get('missing', missing), options.get('gap', gap)
+            elif in_block and word == 'matrix':
+                return cls.from_rows(parse_rows(statement), missing, gap)
+
+    @classmethod
+    def from_file(cls, path):
+        with open_text(path) as handle:
+            return cls.from_handle(handle)
+
+    # statistics
+    @property
+    def missing(self):
+        """A boolean array of missing or gap cells"""
+        return self.matrix >= GAP
+
+    @property
+    def observed(self):
+        """A boolean array of cells with a single observed state"""
+        return self.matrix < POLYMORPHIC
+
+    def missing_by_character(self):
+        return self.missing.mean(axis=0) if self.ntaxa else np.zeros(self.nchar)
+
+    def missing_by_taxon(self):
+        return self.missing.mean(axis=1) if self.nchar else np.zeros(self.ntaxa)
+
+    def missing_fraction(self):
+        return float(self.missing.mean()) if self.matrix.size else 0.0
+
+    def state_counts(self):
+        """Returns a states x characters array of how often each observed state occurs"""
+        states = np.unique(self.matrix[self.observed])
+        if not len(states):
+            return np.zeros((0, self.nchar), dtype=np.int64)
+        return np.stack([(self.matrix == s).sum(axis=0) for s in states])
+
+    def constant_sites(self):
+        """A boolean array of characters with at most one observed state"""
+        return (self.state_counts() > 0).sum(axis=0) <= 1
+
+    def singleton_sites(self):
+        """A boolean array of variable characters where only one state occurs more than once"""
+        counts = self.state_counts()
+        variable = (counts > 0).sum(axis=0) > 1
+        return variable & ((counts > 1).sum(axis=0) <= 1)
+
+    def informative_sites(self):
+        """A boolean array of characters with at least two states occurring more than once"""
+        return (self.state_counts() > 1).sum(axis=0) >= 2
+
+    def empty_taxa(self):
+        """Returns the taxa with no observed data"""
+        return [self.taxa[i] for i in np.flatnonzero(self.missing.all(axis=1))]
+
+    def empty_characters(self):
+        """Returns the (1-based) characters with no observed data"""
+        return [int(i) + 1 for i in np.flatnonzero(self.missing.all(axis=0))]
+
+    def duplicate_taxa(self):
+        """Returns groups of taxa with identical rows"""
+        if not self.ntaxa:
+            return []
+        _, inverse, counts = np.unique(
+            self.matrix, axis=0, return_inverse=True, return_counts=True
+        )
+        inverse = inverse.reshape(-1)
+        return [
+            [self.taxa[i] for i in np.flatnonzero(inverse == group)]
+            for group in np.flatnonzero(counts > 1)
+        ]
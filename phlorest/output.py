@@ -0,0 +1,86 @@
+# coding=utf-8
+"""
+Writers for command output.
+
+`table` collects every record and renders a github table at the end, while
+`jsonl` and `csv` write each record as soon as it is given, so downstream
+tools see results immediately and memory use does not grow.
+"""
+import csv
+import sys
+import json
+from abc import ABC, abstractmethod
+
+FORMATS = ['table', 'jsonl', 'csv']
+
+
+class Writer(ABC):
+    def __init__(self, fields, stream=None):
+        self.fields = fields
+        self.stream = stream or sys.stdout
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:  # don't finish the output of a failed command
+            self.close()
+
+    @abstractmethod
+    def write(self, record):
+        """Writes `record`, a dictionary with (some of) the `fields` as keys"""
+
+    def close(self):
+        pass
+
+
+class TableWriter(Writer):
+    """
+    Renders records as a github table. `render` turns a record into a table
+    row and `headers` labels the columns, defaulting to the record fields.
+    """
+    def __init__(self, fields, stream=None, headers=None, render=None):
+        super().__init__(fields, stream)
+        self.headers = headers or fields
+        self.render = render or (lambda record: [record.get(f) for f in self.fields])
+        self.rows = []
+
+    def write(self, record):
+        self.rows.append(self.render(record))
+
+    def close(self):
+        from tabulate import tabulate
+        print(tabulate(self.rows, headers=self.headers, tablefmt="github"), file=self.stream)
+
+
+class JSONLWriter(Writer):
+    def write(self, record):
+        print(json.dumps({f: record.get(f) for f in self.fields}, ensure_ascii=False), file=self.stream)
+        self.stream.flush()
+
+
+class CSVWriter(Writer):
+    def __init__(self, fields, stream=None):
+        super().__init__(fields, stream)
+        self.writer = csv.writer(self.stream)
+        self.writer.writerow(fields)
+
+    @staticmethod
+    def value(value):
+        if isinstance(value, (list, tuple)):
+            return ";".join(str(v) for v in value)
+        return '' if value is None else value
+
+    def write(self, record):
+        self.writer.writerow([self.value(record.get(f)) for f in self.fields])
+        self.stream.flush()
+
+
+def get_writer(fmt, fields, stream=None, headers=None, render=None):
+    if fmt == 'table':
+        return TableWriter(fields, stream, headers=headers, render=render)
+    elif fmt == 'jsonl':
+        return JSONLWriter(fields, stream)
+    elif fmt == 'csv':
+        return CSVWriter(fields, stream)
+    raise ValueError("Unknown format %s" % fmt)
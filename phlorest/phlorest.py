@@ -2,12 +2,16 @@
 # coding=utf-8
 import csv
 import logging
-from warnings import warn
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
-import yaml
-
-from nexus import NexusReader
+from .bipartitions import compare_trees, first_tree, read_posterior, varying_tips
+from .cache import FileCache
+from .compressed import is_compressed, open_text, uncompressed, variants
+from .profiling import noop
+from .trees import scan_trees
+from .validation import WarningsCollector, ERROR, INFO
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +25,15 @@ SCALINGS = [
     'millennia',      # millennia
 ]
 
+# the attributes that `Phlorest.check` expects to be present
+FILES = [
+    'makefile', 'source',
+    'original', 'paper', 'data', 'notes',
+    'nexus', 'characters',
+    'cldf',
+    'summary', 'posterior',
+]
+
 
 def read_csv(path):
     header = False
@@ -33,38 +46,156 @@ def read_csv(path):
                 yield dict(zip(header, row))
 
 
+def count_rows(path):
+    """Returns the number of data rows in the csv file `path`"""
+    return sum(1 for _ in read_csv(path))
+
+
+def read_details(path):
+    import yaml
+    with path.open('r', encoding="utf8") as handle:
+        return yaml.load(handle, Loader=yaml.FullLoader)
+
+
+def read_taxa(path):
+    return {row['taxon']: row for row in read_csv(path)}
+
+
+def read_text(path):
+    return path.read_text(encoding="utf8")
+
+
+def read_matrix(path):
+    from .matrix import CharacterMatrix
+    return CharacterMatrix.from_file(path)
+
+
+def has_numpy():
+    return find_spec('numpy') is not None
+
+
+def read_nexus(path):
+    from nexus import NexusReader
+    if is_compressed(path):
+        with open_text(path) as handle:
+            return NexusReader.from_string(handle.read())
+    return NexusReader(str(path))
+
+
 class Phlorest:
-    def __init__(self, dirname):
+    def __init__(self, dirname, cache_dir=None):
         self.dirname = Path(dirname)
+        self.cache_dir = Path(cache_dir) if cache_dir else None  # for persistent indexes
         self.logging = logging.getLogger(self.dirname.stem)
-        self._details, self._taxa = None, None  # lazy caches
+        self._cache = FileCache()  # parsed files, invalidated on change
+        self._entries = {}  # directory snapshots
+        self.profiler = None  # set to a `Profiler` to time each stage
     
     def __repr__(self):
         return '<Phlorest Dataset %s>' % self.details.get('id', '?')
         
+    def entries(self, subdir=None):
+        """
+        Returns a {name: is_dir} snapshot of the dataset directory (or of
+        `subdir` within it), taken with a single `os.scandir` call and kept
+        until `refresh` is called.
+        """
+        key = subdir or ''
+        if key not in self._entries:
+            try:
+                with os.scandir(str(self.dirname / key)) as scanner:
+                    self._entries[key] = {e.name: e.is_dir() for e in scanner}
+            except (FileNotFoundError, NotADirectoryError):
+                self._entries[key] = {}
+        return self._entries[key]
+    
+    def refresh(self):
+        """Discards the directory snapshots so that changes on disk are seen"""
+        self._entries = {}
+    
     def _get(self, filename):
-        filename = self.dirname / filename
-        if not filename.exists():
+        entries = self.entries()
+        if filename not in entries:
             return None
-        elif filename.is_dir():
-            return [x for x in filename.iterdir() if not x.name.startswith(".")]
+        elif entries[filename]:
+            return [
+                self.dirname / filename / x
+                for x in self.entries(filename) if not x.startswith(".")
+            ]
         else:
-            return filename
+            return self.dirname / filename
+    
+    def _get_compressed(self, filename):
+        """Like `_get`, but also finds compressed variants of `filename`"""
+        for name in variants(filename):
+            found = self._get(name)
+            if found:
+                return found
 
     @property
     def details(self):
-        if not self._details:
-            with (self.dirname / 'details.txt').open('r', encoding="utf8") as handle:
-                self._details = yaml.load(handle, Loader=yaml.FullLoader)
-        return self._details
+        return self._cache.get(self.dirname / 'details.txt', read_details) or {}
     
     @property
     def taxa(self):
-        if not (self.dirname / 'taxa.csv').exists():  # pragma: no cover
-            self._taxa = {}
-        elif not self._taxa:
-            self._taxa = {row['taxon']: row for row in read_csv(self.dirname / 'taxa.csv')}
-        return self._taxa
+        if 'taxa.csv' not in self.entries():  # pragma: no cover
+            return {}
+        return self._cache.get(self.dirname / 'taxa.csv', read_taxa)
+    
+    # parsed files
+    @property
+    def bibtex(self):
+        return self._cache.get(self.source, read_text) if self.source else None
+    
+    @property
+    def nexus_data(self):
+        return self._cache.get(self.nexus, read_nexus) if self.nexus else None
+    
+    @property
+    def matrix(self):
+        """
+        The data.nex matrix as a `CharacterMatrix`, or None if there is no
+        matrix or numpy is not installed.
+        """
+        if not self.nexus or not has_numpy():
+            return None
+        return self._cache.get(self.nexus, read_matrix)
+    
+    @property
+    def rows(self):
+        """
+        The data.nex matrix as memory-mapped `MatrixRows`, reading single rows
+        or character columns through an offset index, or None if there is no
+        uncompressed data.nex. The index is kept in `cache_dir` if given.
+        """
+        if not self.nexus or is_compressed(self.nexus):
+            return None
+        return self._cache.get(self.nexus, self._read_rows)
+    
+    def _read_rows(self, path):
+        from .rowindex import MatrixRows
+        return MatrixRows.from_file(path, self.cache_dir)
+    
+    @property
+    def ncharacters(self):
+        return self._cache.get(self.characters, count_rows) if self.characters else None
+    
+    @property
+    def posterior_trees(self):
+        """
+        The trees in posterior.trees as a `Posterior` of their summary, clade
+        counts and topology counts, all read in a single pass.
+        """
+        return self._cache.get(self.posterior, read_posterior) if self.posterior else None
+    
+    @property
+    def topologies(self):
+        """The distinct topologies in posterior.trees as `TopologyCounts`"""
+        return self.posterior_trees.topologies if self.posterior else None
+    
+    def trees(self, path):
+        """Returns a (cached) `TreeFile` summary for the trees file `path`"""
+        return self._cache.get(path, scan_trees)
     
     # files
     @property
@@ -86,7 +217,7 @@ class Phlorest:
 
     @property
     def nexus(self):
-        return self._get("data.nex")
+        return self._get_compressed("data.nex")
 
     @property
     def notes(self):
@@ -106,86 +237,226 @@ class Phlorest:
 
     @property
     def summary(self):
-        return self._get("summary.trees")
+        return self._get_compressed("summary.trees")
 
     @property
     def posterior(self):
-        return self._get("posterior.trees")
+        return self._get_compressed("posterior.trees")
+    
+    def _stage(self, name, *paths):
+        """Returns a context manager timing stage `name` if profiling is on"""
+        if self.profiler is None:
+            return noop()
+        return self.profiler.stage(self.dirname.name, name, *paths)
     
-    def validate(self):
+    def validate(self, collector=None, support=None, glottolog=None, topologies=False):
+        """
+        Validates the dataset, reporting problems to `collector` and returning
+        them as a list of `Result`s. If no collector is given the problems are
+        also issued as warnings.
+        
+        If `support` is given, the clades in the summary tree with a lower
+        frequency than this in the posterior are reported too. If `glottolog`
+        (a `Glottolog` snapshot) is given, the isocodes and glottocodes in
+        taxa.csv are checked against it. If `topologies` is set, the number of
+        distinct topologies in the posterior is reported.
+        """
+        report = WarningsCollector(self.dirname.name) if collector is None else collector
+        
         # check scaling
-        if self.details.get('scaling') not in SCALINGS:
-            warn(
-                "Unknown Scaling '%s'" % self.details.get('scaling')
-            )
+        with self._stage('details', self.dirname / 'details.txt'):
+            if self.details.get('scaling') not in SCALINGS:
+                report.add(
+                    'scaling', "Unknown Scaling '%s'" % self.details.get('scaling'),
+                    file=self.dirname / 'details.txt'
+                )
         
         # check taxa file
-        if len(self.taxa) == 0:
-            warn("No taxa defined")
-        if self.taxa and not len(self.taxa.keys()):
-            warn("Empty taxa file")
+        with self._stage('taxa', self.dirname / 'taxa.csv'):
+            if len(self.taxa) == 0:
+                report.add('taxa', "No taxa defined", file=self.dirname / 'taxa.csv')
+            if self.taxa and not len(self.taxa.keys()):
+                report.add('taxa', "Empty taxa file", file=self.dirname / 'taxa.csv')
+        
+        # check the language codes in the taxa file
+        if glottolog is not None and self.taxa:
+            with self._stage('glottolog', self.dirname / 'taxa.csv'):
+                for problem, items in glottolog.check(self.taxa):
+                    report.add(
+                        'glottolog',
+                        "%s in %s taxa.csv: %s" % (
+                            problem.capitalize(), self.details.get('id', '?'), ", ".join(items)
+                        ),
+                        file=self.dirname / 'taxa.csv'
+                    )
             
         # check source file
-        if not self.source:
-            warn("No source bibtex")
-        if self.source and len(self.source.read_text()) == 0:
-            warn("Empty bibtex file")
+        with self._stage('source', self.source):
+            if not self.source:
+                report.add('source', "No source bibtex")
+            if self.source and len(self.bibtex) == 0:
+                report.add('source', "Empty bibtex file", file=self.source)
         
-        # check trees
+        # check trees. Every posterior tree is parsed once if its clades or
+        # topologies are needed, otherwise the trees are only counted.
+        parse_posterior = bool(self.summary) or topologies
         for tf in [self.summary, self.posterior]:
-            if tf and tf.exists():
-                nex = NexusReader(tf)
-                if not nex.trees:
-                    warn("No trees in %s.%s!" % (self.details.get('id', '?'), tf.stem))
-                # are all the taxa in the tree listed in the taxa table?
-                unknown = [t for t in nex.trees.taxa if t not in self.taxa]
-                if len(unknown):
-                    warn(
-                        "Unknown tips in %s.%s: %r" % (self.details.get('id', '?'), tf.stem, unknown)
+            if tf:
+                stem = uncompressed(tf).stem
+                with self._stage(stem, tf):
+                    if tf == self.posterior and parse_posterior:
+                        trees = self.posterior_trees.trees
+                    else:
+                        trees = self.trees(tf)
+                    if not trees.ntrees:
+                        report.add(
+                            'trees', "No trees in %s.%s!" % (self.details.get('id', '?'), stem),
+                            file=tf, severity=ERROR
+                        )
+                    # are all the taxa in the tree listed in the taxa table?
+                    unknown = [t for t in trees.taxa if t not in self.taxa]
+                    if len(unknown):
+                        report.add(
+                            'trees',
+                            "Unknown tips in %s.%s: %r" % (self.details.get('id', '?'), stem, unknown),
+                            file=tf
+                        )
+        
+        # the summary and every posterior tree should have the same tips
+        if self.summary and self.posterior:
+            with self._stage('clades', self.summary, self.posterior):
+                counts = self.posterior_trees.clades
+                tree = first_tree(self.summary, counts.taxonset)
+                summary_only, posterior_only, unsupported = compare_trees(tree, counts, support or 0)
+                if summary_only or posterior_only:
+                    report.add(
+                        'trees',
+                        "Tips differ between %s summary and posterior trees: summary only %r, posterior only %r" % (
+                            self.details.get('id', '?'), sorted(summary_only), sorted(posterior_only)
+                        ),
+                        file=self.posterior
+                    )
+                varying = varying_tips(counts)
+                if varying:
+                    report.add(
+                        'trees',
+                        "Tips differ between %s posterior trees: %r missing from some trees" % (
+                            self.details.get('id', '?'), sorted(varying)
+                        ),
+                        file=self.posterior
+                    )
+                if support is not None and unsupported:
+                    report.add(
+                        'support',
+                        "Clades in %s summary tree with posterior support below %.2f: %s" % (
+                            self.details.get('id', '?'), support,
+                            "; ".join("%s (%.2f)" % (",".join(c), f) for c, f in unsupported)
+                        ),
+                        file=self.summary
+                    )
+        
+        # how many different trees does the posterior hold?
+        if topologies and self.posterior:
+            with self._stage('topologies', self.posterior):
+                counts = self.topologies
+                if counts.ntrees:
+                    report.add(
+                        'topologies',
+                        "%d distinct topologies in %d trees in %s posterior (most frequent: %s)" % (
+                            len(counts), counts.ntrees, self.details.get('id', '?'),
+                            ", ".join("%.3f" % f for _, _, f in counts.frequencies()[:5])
+                        ),
+                        file=self.posterior, severity=INFO
                     )
         
         # if we have a data file, the taxa should match the taxa.csv
         if self.nexus and self.taxa:
-            nex = NexusReader(self.nexus)
-            if not nex.data:
-                warn("No data in %s data.nex!" % self.details.get('id', '?'))
-            else:
-                unknown = [t for t in nex.data.taxa if t not in self.taxa]
-                if len(unknown):
-                    warn(
-                        "Unknown tips in %s data.nex: %r" % (self.details.get('id', '?'), unknown)
+            with self._stage('nexus', self.nexus):
+                nex = self.nexus_data
+                if not nex.data:
+                    report.add(
+                        'nexus', "No data in %s data.nex!" % self.details.get('id', '?'),
+                        file=self.nexus, severity=ERROR
+                    )
+                else:
+                    unknown = [t for t in nex.data.taxa if t not in self.taxa]
+                    if len(unknown):
+                        report.add(
+                            'nexus',
+                            "Unknown tips in %s data.nex: %r" % (self.details.get('id', '?'), unknown),
+                            file=self.nexus
+                        )
+        
+        # the matrix should not have empty or duplicate rows, or empty characters
+        if self.nexus:
+            with self._stage('matrix', self.nexus):
+                try:
+                    matrix = self.matrix
+                except ValueError as e:  # e.g. rows of different lengths
+                    matrix = None
+                    report.add(
+                        'matrix', "Invalid matrix in %s data.nex: %s" % (self.details.get('id', '?'), e),
+                        file=self.nexus, severity=ERROR
                     )
+                if matrix is not None and matrix.nchar:
+                    empty = matrix.empty_taxa()
+                    if empty:
+                        report.add(
+                            'matrix',
+                            "Taxa with no data in %s data.nex: %r" % (self.details.get('id', '?'), empty),
+                            file=self.nexus
+                        )
+                    empty = matrix.empty_characters()
+                    if empty:
+                        report.add(
+                            'matrix',
+                            "Characters with no data in %s data.nex: %r" % (self.details.get('id', '?'), empty),
+                            file=self.nexus
+                        )
+                    duplicates = matrix.duplicate_taxa()
+                    if duplicates:
+                        report.add(
+                            'matrix',
+                            "Taxa with identical data in %s data.nex: %r" % (self.details.get('id', '?'), duplicates),
+                            file=self.nexus, severity=INFO
+                        )
         
         # if we have characters they should match the nexus
         if self.characters and self.nexus:
-            nex = NexusReader(self.nexus)
-            if not nex.data or not nex.data.taxa:
-                warn("No data in %s.%s!" % (self.details.get('id', '?'), tf.stem))
-            else:
-                nchar = [i for i, r in enumerate(read_csv(self.characters), 1)][-1]
-                if  nchar != nex.data.nchar:
-                    warn("characters.csv incorrect in %s - expected %d, got %d" % (
-                        self.details.get('id', '?'), nex.data.nchar, nchar)
+            with self._stage('characters', self.characters, self.nexus):
+                nex = self.nexus_data
+                if not nex.data or not nex.data.taxa:
+                    report.add(
+                        'characters', "No data in %s data.nex!" % self.details.get('id', '?'),
+                        file=self.nexus, severity=ERROR
                     )
-            
+                else:
+                    nchar = self.ncharacters
+                    if  nchar != nex.data.nchar:
+                        report.add(
+                            'characters',
+                            "characters.csv incorrect in %s - expected %d, got %d" % (
+                                self.details.get('id', '?'), nex.data.nchar, nchar
+                            ),
+                            file=self.characters
+                        )
+        return report.results
         
     def check(self, validate=False):
-        attrs = [
-            'makefile', 'source',
-            'original', 'paper', 'data', 'notes',
-            'nexus', 'characters',
-            'cldf',
-            'summary', 'posterior',
-        ]
-        errors = [a for a in attrs if not getattr(self, a)]
+        with self._stage('details', self.dirname / 'details.txt'):
+            has_id = bool(self.details.get('id'))
+        with self._stage('files'):
+            errors = [a for a in FILES if not getattr(self, a)]
         # special checks
-        if not self.details.get('id'):  # empty details
+        if not has_id:  # empty details
             errors.append("details.txt")
-        if not len(self.taxa.keys()):  # no taxa defined
-            errors.append("taxa.csv")
-        if self.source and len(self.source.read_text()) == 0:
-            errors.append("source")  # empty source
+        with self._stage('taxa', self.dirname / 'taxa.csv'):
+            if not len(self.taxa.keys()):  # no taxa defined
+                errors.append("taxa.csv")
+        with self._stage('source', self.source):
+            if self.source and len(self.bibtex) == 0:
+                errors.append("source")  # empty source
         
         if validate:
             self.validate()
-        return errors
\ No newline at end of file
+        return errors
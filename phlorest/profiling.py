@@ -0,0 +1,94 @@
+# coding=utf-8
+"""
+Per-stage timing of `Phlorest.validate` and `Phlorest.check`.
+
+Set `Phlorest.profiler` to a `Profiler` and each stage records its wall
+time and the size of its input files (whether or not they are read again
+or served from the `FileCache`). Tracing memory slows down allocation-heavy
+stages a lot, so the peak traced memory is only recorded with
+`Profiler(memory=True)`, and the timings of such a run are not comparable
+to those of a run without it.
+"""
+import json
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+
+Stage = namedtuple('Stage', ['dataset', 'stage', 'seconds', 'size', 'peak'])
+
+
+def filesize(path):
+    try:
+        return path.stat().st_size
+    except (AttributeError, OSError):
+        return 0
+
+
+@contextmanager
+def noop():
+    yield
+
+
+class Profiler:
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stages = []
+
+    def __len__(self):
+        return len(self.stages)
+
+    @contextmanager
+    def stage(self, dataset, name, *paths):
+        started = False
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started = True
+            elif hasattr(tracemalloc, 'reset_peak'):  # pragma: no cover
+                tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = 0
+            if self.memory:
+                peak = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+                if started:
+                    tracemalloc.stop()
+            self.stages.append(Stage(
+                dataset, name, seconds, sum(filesize(p) for p in paths if p), peak
+            ))
+
+    def ranked(self, limit=None):
+        """Returns the recorded stages, slowest first"""
+        return sorted(self.stages, key=lambda s: s.seconds, reverse=True)[:limit]
+
+    def totals(self):
+        """Returns the total [seconds, size, peak] for each stage name, slowest first"""
+        totals = {}
+        for s in self.stages:
+            t = totals.setdefault(s.stage, [0.0, 0, 0])
+            t[0] += s.seconds
+            t[1] += s.size
+            t[2] = max(t[2], s.peak)
+        return sorted(totals.items(), key=lambda i: i[1][0], reverse=True)
+
+    def summary(self, limit=20):
+        from tabulate import tabulate
+        n = 5 if self.memory else 4  # without the peak memory column
+        headers = ['Dataset', 'Stage', 'Seconds', 'Input Size', 'Peak Memory'][:n]
+        return "\n\n".join([
+            tabulate(
+                [[s.dataset, s.stage, '%.4f' % s.seconds, s.size, s.peak][:n] for s in self.ranked(limit)],
+                headers=headers, tablefmt="github"),
+            tabulate(
+                [[name, '%.4f' % t[0], t[1], t[2]][:n - 1] for name, t in self.totals()],
+                headers=headers[1:], tablefmt="github"),
+        ])
+
+    def write(self, path):
+        with open(str(path), 'w', encoding='utf8') as handle:
+            json.dump({'stages': [s._asdict() for s in self.stages]}, handle, indent=1)
@@ -0,0 +1,79 @@
+# coding=utf-8
+"""
+Renders the README.md of a dataset.
+"""
+from pathlib import Path
+from textwrap import dedent
+
+README = 'README.md'
+
+
+def render(ds):
+    """Returns the README.md content for the dataset `ds`"""
+    def fmt(x):
+        template = "[%(var)s](%(var)s)"
+        if x is None:  # pragma: no cover
+            return None
+        elif isinstance(x, Path):
+            return template % {'var': x.relative_to(ds.dirname)}
+        else:
+            return template % {'var': x}
+
+    nchar = ""
+    if ds.characters:
+        nchar = "%d characters - " % ds.ncharacters
+
+    matrix = ""
+    try:
+        data = ds.matrix
+    except ValueError:  # an invalid matrix, which validate reports
+        data = None
+    if data is not None and data.nchar:
+        matrix = "%d taxa x %d characters, %.1f%% missing, %d constant and %d singleton sites - " % (
+            data.ntaxa, data.nchar, data.missing_fraction() * 100,
+            data.constant_sites().sum(), data.singleton_sites().sum()
+        )
+
+    topologies = ""
+    if ds.posterior and ds.topologies.ntrees:
+        topologies = " (%d trees, %d distinct topologies)" % (ds.topologies.ntrees, len(ds.topologies))
+
+    text = dedent(f"""\
+    # {ds.details['name']}:
+
+    ```
+    {ds.details['reference']}
+    ```
+
+    * ID: {ds.details['id']}:
+    * URL: {fmt(ds.details['url'])}
+    * Paper: {fmt(ds.dirname / 'paper')}
+    * Original Files: {fmt(ds.dirname / 'original')}
+    * Scaling: {ds.details['scaling']}
+    * Taxa: {len(ds.taxa)} taxa 
+    * Data: {fmt(ds.dirname / 'data')}
+    * Nexus: {matrix}{fmt(ds.nexus)}
+    * Character Specification: {nchar}{fmt(ds.characters)}
+    * Summary Tree: {fmt(ds.summary)}
+    * Posterior Probability Distribution: {fmt(ds.posterior)}{topologies}
+
+    ## Errors:
+    """) + "\n"
+
+    for e in ds.check():  # pragma: no cover
+        text += "* missing %s\n" % e
+    return text
+
+
+def write_readme(dirname):
+    """
+    Writes the README.md of the dataset in `dirname` if its content changed,
+    leaving an unchanged file (and its mtime) alone. Returns True if written.
+    """
+    from .phlorest import Phlorest
+    path = Path(dirname) / README
+    text = render(Phlorest(dirname))
+    if path.exists() and path.read_text(encoding='utf8') == text:
+        return False
+    path.write_text(text, encoding='utf8')
+    return True
@@ -0,0 +1,235 @@
+# coding=utf-8
+"""
+Random access to the rows of the matrix in `data.nex`.
+
+A `RowIndex` records the byte offsets of each taxon's row (or rows, for an
+interleaved matrix), and can be stored in the repository's `.phlorest`
+cache directory, where it is reused until the mtime or size of `data.nex`
+changes. `MatrixRows` memory-maps `data.nex` and uses the index to read
+single rows or character columns without parsing the rest of the file. For
+rows with one character per byte, a column is read as just those bytes.
+
+Only uncompressed files can be memory-mapped.
+"""
+import re
+import os
+import json
+import mmap
+from pathlib import Path
+
+from .compressed import is_compressed
+from .trees import strip_comments, unquote
+
+_STATE = re.compile(r"[({][^)}]*[)}]|\S")
+
+
+# rows holding anything other than one state per byte.
+_IRREGULAR = re.compile(rb"[\s\[\](){}]")
+
+
+def sidecar(path, cache_dir):
+    """Returns the path of the row index for the nexus file `path` in `cache_dir`"""
+    path = Path(path)
+    return Path(cache_dir) / 'rows' / ('%s.%s.json' % (path.parent.name, path.name))
+
+
+def split_label(line):
+    """Returns (label, start of the rest of the line) for a matrix row"""
+    start = len(line) - len(line.lstrip())
+    if line[start:start + 1] == b"'":
+        end = line.index(b"'", start + 1)
+        while line[end:end + 2] == b"''":
+            end = line.index(b"'", end + 2)
+        end += 1
+    else:
+        end = start
+        while end < len(line) and not line[end:end + 1].isspace():
+            end += 1
+    return unquote(line[start:end].decode('utf8')), end
+
+
+def scan_rows(handle):
+    """
+    Returns ({taxon: [(offset, length), ...]}, [taxon, ...]) for the matrix
+    rows in the data or characters block read from the binary file `handle`,
+    where the list is of the taxa whose single row has one state per byte.
+    """
+    rows, fixed, in_block, in_matrix = {}, set(), False, False
+    while True:
+        offset = handle.tell()
+        line = handle.readline()
+        if not line:
+            break
+        if not in_matrix:
+            words = line.strip().lower().split()
+            if words and words[0] == b'begin':
+                in_block = words[-1].rstrip(b';') in (b'data', b'characters')
+            elif words and words[0].rstrip(b';') in (b'end', b'endblock'):
+                in_block = False
+            elif in_block and words and words[0] == b'matrix':
+                in_matrix = True
+                skip = line.lower().index(b'matrix') + len(b'matrix')
+                offset, line = offset + skip, line[skip:]
+            if not in_matrix:
+                continue
+        content = line.rstrip(b'\r\n')
+        done = ';' in strip_comments(content.decode('utf8'))
+        if done:
+            content = content[:content.rindex(b';')]
+        if strip_comments(content.decode('utf8')).strip():
+            label, start = split_label(content)
+            while content[start:start + 1].isspace():
+                start += 1
+            length = len(content.rstrip()) - start
+            rows.setdefault(label, []).append((offset + start, length))
+            sequence = content[start:start + length]
+            if len(rows[label]) == 1 and sequence.isascii() and not _IRREGULAR.search(sequence):
+                fixed.add(label)
+            else:
+                fixed.discard(label)
+        if done:
+            break
+    return rows, [t for t in rows if t in fixed]
+
+
+class RowIndex:
+    def __init__(self, rows, fixed=(), mtime=None, size=None):
+        self.rows = rows
+        self.fixed = set(fixed)
+        self.mtime = mtime
+        self.size = size
+
+    def __repr__(self):
+        return '<RowIndex of %d taxa>' % len(self.rows)
+
+    @classmethod
+    def build(cls, path):
+        stat = os.stat(str(path))
+        with open(str(path), 'rb') as handle:
+            rows, fixed = scan_rows(handle)
+        return cls(rows, fixed, stat.st_mtime_ns, stat.st_size)
+
+    @classmethod
+    def load(cls, path, cache_dir):
+        """Returns the index for `path` stored in `cache_dir`, or None if it is missing or stale"""
+        try:
+            with sidecar(path, cache_dir).open(encoding='utf8') as handle:
+                stored = json.load(handle)
+            stat = os.stat(str(path))
+            if [stored['mtime'], stored['size']] != [stat.st_mtime_ns, stat.st_size]:
+                return None
+            return cls(
+                {k: [tuple(s) for s in v] for k, v in stored['rows'].items()},
+                stored['fixed'], stored['mtime'], stored['size'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @classmethod
+    def from_file(cls, path, cache_dir=None):
+        """
+        Returns the index for `path`, reading it from `cache_dir` if given
+        and storing it there if it had to be built.
+        """
+        index = cls.load(path, cache_dir) if cache_dir else None
+        if index is None:
+            index = cls.build(path)
+            if cache_dir:
+                index.save(path, cache_dir)
+        return index
+
+    def save(self, path, cache_dir):
+        target = sidecar(path, cache_dir)
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with target.open('w', encoding='utf8') as handle:
+                json.dump({
+                    'mtime': self.mtime, 'size': self.size,
+                    'rows': self.rows, 'fixed': sorted(self.fixed),
+                }, handle)
+        except OSError:  # pragma: no cover
+            pass  # a read-only repository just rebuilds the index each time
+
+
+class MatrixRows:
+    """Rows and columns of the matrix in a nexus file, read through mmap"""
+    def __init__(self, path, index):
+        self.path = Path(path)
+        self.index = index
+        self._handle = open(str(path), 'rb')
+        try:
+            self._map = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file cannot be mapped
+            self._map = b''
+
+    def __repr__(self):
+        return '<MatrixRows of %s>' % self.path
+
+    def __len__(self):
+        return len(self.index.rows)
+
+    def __contains__(self, taxon):
+        return taxon in self.index.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    @classmethod
+    def from_file(cls, path, cache_dir=None):
+        if is_compressed(path):
+            raise ValueError("Cannot memory-map compressed file %s" % path)
+        return cls(path, RowIndex.from_file(path, cache_dir))
+
+    @property
+    def closed(self):
+        return self._handle.closed
+
+    def close(self):
+        if isinstance(getattr(self, '_map', None), mmap.mmap):
+            self._map.close()
+        if getattr(self, '_handle', None):
+            self._handle.close()
+
+    @property
+    def taxa(self):
+        return list(self.index.rows)
+
+    def sequence(self, taxon):
+        """Returns the raw sequence of `taxon`, joining interleaved rows"""
+        parts = [
+            self._map[offset:offset + length].decode('utf8')
+            for offset, length in self.index.rows[taxon]
+        ]
+        return ''.join(strip_comments(''.join(parts)).split())
+
+    def row(self, taxon):
+        """Returns the states of `taxon` as a list, with polymorphisms as one state"""
+        sequence = self.sequence(taxon)
+        if '(' in sequence or '{' in sequence:
+            return _STATE.findall(sequence)
+        return list(sequence)
+
+    def columns(self, start, stop=None):
+        """
+        Returns {taxon: [state, ...]} for the characters from `start` up to
+        `stop`, counted from 0 as in a python slice.
+        """
+        stop = start + 1 if stop is None else stop
+        columns = {}
+        for taxon, segments in self.index.rows.items():
+            if taxon in self.index.fixed and 0 <= start <= stop:
+                offset, length = segments[0]
+                data = self._map[offset + min(start, length):offset + min(stop, length)]
+                columns[taxon] = list(data.decode('utf8'))
+            else:
+                columns[taxon] = self.row(taxon)[start:stop]
+        return columns
+
+    def column(self, i):
+        """Returns {taxon: state} for character `i`, counted from 0"""
+        return {taxon: states[0] if states else None for taxon, states in self.columns(i).items()}
@@ -0,0 +1,118 @@
+# coding=utf-8
+"""
+Generates synthetic phlorest repositories for testing and benchmarking.
+
+Datasets are laid out as `create.create` makes them, and filled in with
+random (but seeded, so reproducible) taxa, trees and character data.
+"""
+import random
+
+from .create import create
+
+DETAILS = """id: {name}
+name: Synthetic dataset {name}
+author: Synthetic
+year: 2020
+scaling: years
+reference: "Synthetic, S. (2020). A generated dataset."
+url: https://example.org/{name}
+cldf: https://example.org/{name}/cldf
+"""
+
+SOURCE = """@article{{{name},
+author = {{Synthetic, S.}},
+title = {{A generated dataset}},
+year = {{2020}}
+}}
+"""
+
+MAKEFILE = """all: summary.trees posterior.trees
+
+summary.trees: original/{name}.trees
+\tcp $< $@
+"""
+
+
+def taxon_names(ntaxa):
+    return ['taxon_%d' % i for i in range(1, ntaxa + 1)]
+
+
+def random_newick(labels, rng):
+    """Returns a random rooted binary tree over `labels` with branch lengths"""
+    nodes = [(str(label), 0.0) for label in labels]
+    while len(nodes) > 1:
+        i, j = sorted(rng.sample(range(len(nodes)), 2), reverse=True)
+        (a, ha), (b, hb) = nodes.pop(i), nodes.pop(j)
+        height = max(ha, hb) + rng.random()
+        nodes.append(("(%s:%.6f,%s:%.6f)" % (a, height - ha, b, height - hb), height))
+    return nodes[0][0] + ";"
+
+
+def trees_file(taxa, ntrees, rng):
+    """Returns a nexus trees file with a TRANSLATE block and `ntrees` random trees"""
+    lines = ["#NEXUS", "", "begin trees;", "\ttranslate"]
+    lines.extend(
+        "\t\t%d %s%s" % (i, t, ',' if i < len(taxa) else '') for i, t in enumerate(taxa, 1)
+    )
+    lines.append("\t\t;")
+    for n in range(ntrees):
+        lines.append("\ttree STATE_%d = [&R] %s" % (
+            n * 1000, random_newick(range(1, len(taxa) + 1), rng)
+        ))
+    lines.extend(["end;", ""])
+    return "\n".join(lines)
+
+
+def nexus_file(taxa, nchar, rng):
+    """Returns a nexus data file with a random binary matrix"""
+    width = max(len(t) for t in taxa) + 2
+    lines = [
+        "#NEXUS", "", "begin data;",
+        "\tdimensions ntax=%d nchar=%d;" % (len(taxa), nchar),
+        '\tformat datatype=standard missing=? gap=- symbols="01";',
+        "\tmatrix",
+    ]
+    for taxon in taxa:
+        row = ''.join(rng.choice('0011?') for _ in range(nchar))
+        lines.append("\t%s%s" % (taxon.ljust(width), row))
+    lines.extend(["\t;", "end;", ""])
+    return "\n".join(lines)
+
+
+def make_dataset(repos_path, name, ntaxa=10, ntrees=10, nchar=10, seed=None):
+    """Creates a complete synthetic dataset `name` in `repos_path`"""
+    rng = random.Random(seed)
+    create(repos_path, name)
+    path = repos_path / name
+    taxa = taxon_names(ntaxa)
+
+    (path / 'details.txt').write_text(DETAILS.format(name=name), encoding="utf8")
+    (path / 'source.bib').write_text(SOURCE.format(name=name), encoding="utf8")
+    (path / 'Makefile').write_text(MAKEFILE.format(name=name), encoding="utf8")
+    (path / 'taxa.csv').write_text(
+        "taxon,isocode,glottocode,xd_ids,soc_ids\n" + "".join(
+            "%s,,%s,,\n" % (t, 'abcd%04d' % i) for i, t in enumerate(taxa, 1)
+        ), encoding="utf8")
+    (path / 'paper' / ('%s.pdf' % name)).write_bytes(b'%PDF-1.4\n')
+    (path / 'data' / ('%s.csv' % name)).write_text("taxon,value\n", encoding="utf8")
+
+    summary = trees_file(taxa, 1, rng)
+    (path / 'original' / ('%s.trees' % name)).write_text(summary, encoding="utf8")
+    (path / 'summary.trees').write_text(summary, encoding="utf8")
+    (path / 'posterior.trees').write_text(trees_file(taxa, ntrees, rng), encoding="utf8")
+    (path / 'data.nex').write_text(nexus_file(taxa, nchar, rng), encoding="utf8")
+    (path / 'characters.csv').write_text(
+        "Site,Label\n" + "".join("%d,char_%d\n" % (i, i) for i in range(1, nchar + 1)),
+        encoding="utf8")
+    return path
+
+
+def make_repository(path, ndatasets=10, ntaxa=10, ntrees=10, nchar=10, seed=0):
+    """Creates a repository of `ndatasets` synthetic datasets in `path`"""
+    path.mkdir(parents=True, exist_ok=True)
+    for i in range(1, ndatasets + 1):
+        make_dataset(
+            path, 'synthetic%04d' % i,
+            ntaxa=ntaxa, ntrees=ntrees, nchar=nchar, seed=None if seed is None else seed + i
+        )
+    return path
@@ -0,0 +1,60 @@
+# coding=utf-8
+"""
+An inverted index over the taxa.csv files of every dataset in a repository,
+for answering questions like "which datasets contain glottocode X?".
+"""
+import re
+
+FIELDS = ['taxon', 'isocode', 'glottocode', 'xd_ids', 'soc_ids']
+
+_SEPARATORS = re.compile(r"[;,\s]+")
+
+
+def split_values(field, value):
+    """Returns the values in a taxa.csv cell; all fields but `taxon` may list several"""
+    if not value:
+        return []
+    if field == 'taxon':
+        return [value]
+    return [v for v in _SEPARATORS.split(value) if v]
+
+
+class TaxonIndex:
+    def __init__(self):
+        self.index = {field: {} for field in FIELDS}
+
+    def __repr__(self):
+        return '<TaxonIndex of %d taxa>' % len(self.index['taxon'])
+
+    @classmethod
+    def from_records(cls, records):
+        """Builds the index from {dataset: DatasetRecord}"""
+        index = cls()
+        for name in sorted(records):
+            index.add(name, records[name].taxa)
+        return index
+
+    def add(self, dataset, taxa):
+        """Adds the `taxa` ({taxon: row}) of `dataset` to the index"""
+        for row in taxa.values():
+            for field in FIELDS:
+                for value in split_values(field, row.get(field)):
+                    self.index[field].setdefault(value, []).append((dataset, row))
+
+    def lookup(self, field, value):
+        """Returns a list of (dataset, row) for the rows where `field` has `value`"""
+        if field not in self.index:
+            raise ValueError("Unknown field %s" % field)
+        return self.index[field].get(value, [])
+
+    def datasets(self, field, value):
+        return sorted({dataset for dataset, _ in self.lookup(field, value)})
+
+    def shared(self, field='taxon', minimum=2):
+        """Returns {value: [dataset, ...]} for values found in at least `minimum` datasets"""
+        shared = {}
+        for value, rows in self.index[field].items():
+            datasets = sorted({dataset for dataset, _ in rows})
+            if len(datasets) >= minimum:
+                shared[value] = datasets
+        return shared
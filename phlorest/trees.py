@@ -0,0 +1,265 @@
+# coding=utf-8
+"""
+Streaming access to nexus trees blocks.
+
+`NexusReader` parses every tree in a file to answer simple questions like
+"which taxa are in here?". Posterior tree files can hold tens of thousands of
+trees, so the helpers here read a file one statement at a time instead.
+"""
+import re
+
+from .compressed import open_replacing, open_text
+
+# characters that change the tokenizer state: comments, quotes and terminators.
+_SPECIAL = re.compile(r"[\[\]';]")
+_COMMENT = re.compile(r"\[[^\[\]]*\]")
+_ASSIGN = re.compile(r"[\[\]'=]")
+_TIP = re.compile(r"[(,]\s*('(?:[^']|'')*'|[^\s:,()\[\];]+)")
+
+
+def strip_comments(text):
+    """Removes (possibly nested) nexus comments from `text`"""
+    while '[' in text:
+        text, n = _COMMENT.subn('', text)
+        if not n:  # unbalanced
+            break
+    return text
+
+
+def unquote(label):
+    if len(label) > 1 and label.startswith("'") and label.endswith("'"):
+        return label[1:-1].replace("''", "'")
+    return label
+
+
+def iter_statements(handle):
+    """
+    Yields the raw nexus statements (without the terminating ';') in `handle`.
+
+    Only one statement is held in memory at a time, and comments and quoted
+    labels are respected when looking for the terminator.
+    """
+    buffer, depth, quoted = [], 0, False
+    for line in handle:
+        start = 0
+        for match in _SPECIAL.finditer(line):
+            char = match.group()
+            if quoted:
+                if char == "'":
+                    quoted = False
+            elif char == '[':
+                depth += 1
+            elif char == ']':
+                depth = max(0, depth - 1)
+            elif depth:
+                continue
+            elif char == "'":
+                quoted = True
+            else:  # end of statement
+                buffer.append(line[start:match.start()])
+                yield ''.join(buffer).strip()
+                buffer, start = [], match.end()
+        buffer.append(line[start:])
+    rest = ''.join(buffer).strip()
+    if rest:
+        yield rest
+
+
+def keyword(statement):
+    """Returns the lowercased first word of a statement, ignoring comments and #NEXUS"""
+    words = strip_comments(statement[:256]).split(None, 2)
+    if words and words[0].lower() == '#nexus':
+        words = words[1:]
+    return words[0].lower() if words else ''
+
+
+def parse_translate(statement):
+    body = strip_comments(statement).strip()
+    body = body[len('translate'):] if body.lower().startswith('translate') else body
+    translate = {}
+    for pair in body.split(','):
+        pair = pair.split(None, 1)
+        if len(pair) == 2:
+            translate[unquote(pair[0])] = unquote(pair[1].strip())
+    return translate
+
+
+def split_tree(statement):
+    """
+    Returns (head, newick) for a `tree name = newick` statement, splitting at
+    the first '=' outside comments and quoted labels, so that comments like
+    `[&lnP=-10.5]` before the '=' are kept in the head.
+    """
+    depth, quoted = 0, False
+    for match in _ASSIGN.finditer(statement):
+        char = match.group()
+        if quoted:
+            if char == "'":
+                quoted = False
+        elif char == '[':
+            depth += 1
+        elif char == ']':
+            depth = max(0, depth - 1)
+        elif depth:
+            continue
+        elif char == "'":
+            quoted = True
+        else:
+            return statement[:match.start()], statement[match.end():].strip()
+    return statement, ''
+
+
+def get_newick(statement):
+    """Returns the newick string from a `tree name = newick` statement"""
+    return split_tree(statement)[1]
+
+
+def get_tips(newick, translate=None):
+    """Returns the tip labels in `newick`, translated via `translate` if given"""
+    translate = translate or {}
+    tips = [unquote(t) for t in _TIP.findall(strip_comments(newick))]
+    if not tips and newick.strip():  # single taxon tree
+        tips = [unquote(strip_comments(newick).split(':')[0].strip().rstrip(';'))]
+    return [translate.get(t, t) for t in tips]
+
+
+def iter_tree_statements(handle):
+    """
+    Yields (kind, statement) pairs for every statement in `handle` where kind
+    is 'tree' or 'translate' for statements inside a trees block, and None
+    for everything else.
+    """
+    in_trees = False
+    for statement in iter_statements(handle):
+        word = keyword(statement)
+        if word == 'begin':
+            in_trees = strip_comments(statement).lower().split()[-1] == 'trees'
+        elif word in ('end', 'endblock'):
+            in_trees = False
+        if in_trees and word in ('tree', 'translate'):
+            yield (word, statement)
+        else:
+            yield (None, statement)
+
+
+class TreeFile:
+    """
+    A summary of the trees block in a nexus file.
+
+    Only the TRANSLATE block and the first tree are kept, the remaining trees
+    are counted as they stream past.
+    """
+    def __init__(self, translate=None, first=None, ntrees=0):
+        self.translate = translate or {}
+        self.first = first
+        self.ntrees = ntrees
+
+    def __repr__(self):
+        return '<TreeFile with %d trees>' % self.ntrees
+
+    @classmethod
+    def from_handle(cls, handle):
+        tf = cls()
+        for kind, statement in iter_tree_statements(handle):
+            tf.add(kind, statement)
+        return tf
+
+    def add(self, kind, statement):
+        """Adds a (kind, statement) pair from `iter_tree_statements`"""
+        if kind == 'translate':
+            self.translate.update(parse_translate(statement))
+        elif kind == 'tree':
+            if self.first is None:
+                self.first = statement
+            self.ntrees += 1
+
+    @classmethod
+    def from_file(cls, path):
+        with open_text(path) as handle:
+            return cls.from_handle(handle)
+
+    @property
+    def tips(self):
+        """The tips of the first tree"""
+        if self.first is None:
+            return []
+        return get_tips(get_newick(self.first), self.translate)
+
+    @property
+    def taxa(self):
+        """The taxa in the TRANSLATE block, or the tips of the first tree if there is none"""
+        if self.translate:
+            return list(self.translate.values())
+        return self.tips
+
+
+def scan_trees(path):
+    return TreeFile.from_file(path)
+
+
+def parse_burnin(burnin, ntrees):
+    """
+    Returns the number of trees to discard for `burnin`, which is either a
+    number of trees or a percentage like '10%'.
+    """
+    burnin = str(burnin).strip()
+    percent = burnin.endswith('%')
+    try:
+        value = float(burnin[:-1]) if percent else int(burnin)
+    except ValueError:
+        raise ValueError("Invalid burnin %s" % burnin)
+    if percent:
+        if not 0 <= value <= 100:
+            raise ValueError("Burnin %s is not between 0%% and 100%%" % burnin)
+        return int(ntrees * value / 100)
+    if not 0 <= value <= ntrees:
+        raise ValueError("Burnin %d is not between 0 and the number of trees (%d)" % (value, ntrees))
+    return value
+
+
+def select(ntrees, burnin=0, sample=None, seed=None):
+    """
+    Returns the sorted indices of the trees to keep out of `ntrees` after
+    removing `burnin` trees and taking `sample` trees, evenly spaced or
+    (if `seed` is given) at random.
+    """
+    if not 0 <= burnin <= ntrees:
+        raise ValueError("Burnin %d is not between 0 and the number of trees (%d)" % (burnin, ntrees))
+    if sample is not None and sample < 0:
+        raise ValueError("Sample %d is negative" % sample)
+    kept = range(burnin, ntrees)
+    if sample is None or sample >= len(kept):
+        return kept
+    if seed is not None:
+        import random
+        return sorted(random.Random(seed).sample(kept, sample))
+    return [kept[(i * len(kept)) // sample] for i in range(sample)]
+
+
+def thin(src, dest, burnin=0, sample=None, seed=None):
+    """
+    Writes the trees in `src` to `dest` after removing `burnin` trees and
+    taking `sample` trees, keeping everything else (e.g. the TRANSLATE
+    block) intact. Returns the number of trees written. Either file may be
+    compressed.
+
+    The file is streamed twice, once to count the trees and once to write
+    them, so memory use does not depend on the number of trees. `dest` is
+    only replaced once it is complete, so it may be `src` itself.
+    """
+    ntrees = scan_trees(src).ntrees
+    wanted = iter(select(ntrees, parse_burnin(burnin, ntrees), sample, seed))
+    target, index, written = next(wanted, None), 0, 0
+    with open_text(src) as handle, open_replacing(dest) as out:
+        for kind, statement in iter_tree_statements(handle):
+            if kind == 'tree':
+                if index == target:
+                    out.write("\t%s;\n" % statement)
+                    target = next(wanted, None)
+                    written += 1
+                index += 1
+            elif kind == 'translate':
+                out.write("\t%s;\n" % statement)
+            else:
+                out.write("%s;\n" % statement)
+    return written
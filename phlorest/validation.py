@@ -0,0 +1,71 @@
+# coding=utf-8
+"""
+Structured validation results.
+
+`Phlorest.validate` reports each problem it finds to a `Collector` as a
+`Result`. The default `WarningsCollector` also issues the problems via
+`warnings.warn`, which is how validation has always been reported.
+"""
+from collections import namedtuple
+from warnings import warn
+
+# the version of the checks in `Phlorest.validate`, stored with cached results
+# so that results of older checks are not reused. Bump it when the checks change.
+VERSION = 2
+
+ERROR = 'error'
+WARNING = 'warning'
+INFO = 'info'
+
+Result = namedtuple('Result', ['dataset', 'check', 'severity', 'message', 'file'])
+
+
+def failures(results):
+    """Returns the `results` that make a dataset fail validation, i.e. all but INFO"""
+    return [r for r in results if r.severity != INFO]
+
+
+class Collector:
+    """Collects the validation results for a dataset"""
+    def __init__(self, dataset=None):
+        self.dataset = dataset
+        self.results = []
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def add(self, check, message, file=None, severity=WARNING):
+        result = Result(
+            self.dataset, check, severity, message, str(file) if file else None
+        )
+        self.emit(result)
+        return result
+
+    def emit(self, result):
+        self.results.append(result)
+
+
+class WarningsCollector(Collector):
+    """A collector that also reports each result with `warnings.warn`"""
+    def emit(self, result):
+        super().emit(result)
+        warn(result.message, stacklevel=4)
+
+
+def validate_dataset(dirname, support=None, glottolog=None, topologies=False):
+    """
+    Validates the dataset in `dirname` and returns a list of `Result`s.
+    `glottolog` is the path of a Glottolog snapshot, loaded once per process.
+    """
+    from .phlorest import Phlorest
+    if glottolog is not None:
+        from .glottolog import get_glottolog
+        glottolog = get_glottolog(str(glottolog))
+    dataset = Phlorest(dirname)
+    collector = Collector(dataset.dirname.name)
+    dataset.validate(
+        collector=collector, support=support, glottolog=glottolog, topologies=topologies)
+    return collector.results
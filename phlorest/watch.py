@@ -0,0 +1,104 @@
+# coding=utf-8
+"""
+Watches a repository for changes and re-checks the datasets that changed.
+
+The `Repos` and its `Phlorest` objects are kept in memory between polls, so
+a poll only stats the entries of each dataset directory (and its immediate
+subdirectories), and only a changed dataset is checked and validated again.
+"""
+import os
+
+from .validation import Collector, INFO
+
+
+def stamps(dirname):
+    """Returns {relative path: (mtime_ns, size)} for the files in a dataset"""
+    found = {}
+    pending = ['']
+    while pending:
+        subdir = pending.pop()
+        try:
+            scanner = os.scandir(os.path.join(str(dirname), subdir))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with scanner:
+            for entry in scanner:
+                if entry.name.startswith('.'):
+                    continue
+                name = os.path.join(subdir, entry.name)
+                stat = entry.stat()
+                found[name] = (stat.st_mtime_ns, stat.st_size)
+                if entry.is_dir() and not subdir:
+                    pending.append(entry.name)
+    return found
+
+
+class Watcher:
+    def __init__(self, repos, names=None, validate=True):
+        self.repos = repos
+        self.names = names
+        self.validate = validate
+        self.stamps = {}
+        self.status = {}
+        self.info = {}  # the problems that are only INFO results
+        self.root = None
+
+    def __repr__(self):
+        return '<Watcher of %s>' % self.repos.path
+
+    def datasets(self):
+        return sorted(n for n in self.repos.datasets if not self.names or n in self.names)
+
+    def check(self, name):
+        """
+        Returns the set of problems with dataset `name`. A dataset that cannot
+        be checked (e.g. while a file is half-edited) has the error as its
+        problem, so that watching carries on.
+        """
+        dataset = self.repos.datasets[name]
+        dataset.refresh()
+        self.info[name] = set()
+        try:
+            problems = {"missing %s" % e for e in dataset.check()}
+            if self.validate:
+                collector = Collector(name)
+                dataset.validate(collector=collector)
+                problems.update(r.message for r in collector)
+                self.info[name] = {r.message for r in collector if r.severity == INFO}
+        except Exception as e:
+            problems = {"failed to check %s: %s: %s" % (name, type(e).__name__, e)}
+        return problems
+
+    def failed(self, name):
+        """Returns True if dataset `name` has problems other than INFO results"""
+        return bool(self.status.get(name, set()) - self.info.get(name, set()))
+
+    def poll(self):
+        """
+        Re-checks the datasets that changed since the last poll, and returns a
+        list of (name, added, removed) for those whose problems changed. The
+        first poll checks every dataset.
+        """
+        root = os.stat(str(self.repos.path)).st_mtime_ns
+        if root != self.root:  # datasets were added or removed
+            self.repos.reload()
+            self.root = root
+        changes, current = [], []
+        for name in self.datasets():
+            stamp = stamps(self.repos.datasets[name].dirname)
+            if 'details.txt' not in stamp:  # no longer a dataset
+                continue
+            current.append(name)
+            if self.stamps.get(name) == stamp:
+                continue
+            self.stamps[name] = stamp
+            before = self.status.get(name)
+            after = self.status[name] = self.check(name)
+            if before is None or before != after:
+                before = before or set()
+                changes.append((name, sorted(after - before), sorted(before - after)))
+        for name in [n for n in self.status if n not in current]:
+            changes.append((name, [], sorted(self.status.pop(name))))
+            self.stamps.pop(name, None)
+            self.info.pop(name, None)
+        return changes
@@ -41,6 +41,7 @@ setup(
     url=URL,
     packages=find_packages(),
     install_requires=['clldutils', 'tabulate', 'python-nexus>=2.0.2', 'pyyaml'],
+    extras_require={'matrix': ['numpy']},
     include_package_data=True,
     entry_points={
         'console_scripts': ['phlorest=phlorest.__main__:main'],
@@ -0,0 +1,66 @@
+# coding=utf-8
+import pytest
+
+import phlorest.commands
+from phlorest.beast import iter_partitions
+
+from clldutils.clilib import ParserError
+
+XML = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<beast version="2.0">
+    <data id="alignment" dataType="standard">
+        <sequence taxon="a" value="0101010101"/>
+        <sequence taxon="b" value="0110011001"/>
+    </data>
+    <alignment id="one" ascertained="true" excludefrom="0" excludeto="1">
+        <data id="one.filtered" spec="FilteredAlignment" data="@alignment" filter="1-4"/>
+    </alignment>
+    <run id="mcmc" spec="MCMC">
+        <distribution id="likelihood" spec="util.CompoundDistribution">
+            <distribution id="treeLikelihood.one" spec="TreeLikelihood" data="@one"/>
+            <distribution id="treeLikelihood.two" spec="TreeLikelihood">
+                <data id="two" spec="AscertainedAlignment" ascertained="true">
+                    <data id="two.filtered" spec="FilteredAlignment" data="@alignment" filter="5-7"/>
+                </data>
+            </distribution>
+            <distribution id="treeLikelihood.three" spec="TreeLikelihood">
+                <data id="three" spec="AscertainedAlignment" data="@later"/>
+            </distribution>
+        </distribution>
+    </run>
+    <alignment id="later" filter="8-10">
+        <sequence taxon="a" value="010"/>
+    </alignment>
+</beast>
+"""
+
+
+@pytest.fixture
+def xml(tmp_path):
+    path = tmp_path / 'beast.xml'
+    path.write_text(XML)
+    return path
+
+
+def test_iter_partitions(xml):
+    assert list(iter_partitions(str(xml))) == [
+        ('one.filtered', 1, 4, True),
+        ('two.filtered', 5, 7, True),
+        ('later', 8, 10, False),
+    ]
+
+
+def test_beast2chars(xml, mocker, capsys):
+    with pytest.raises(ParserError):
+        phlorest.commands.beast2chars(mocker.Mock(args=[]))
+    
+    phlorest.commands.beast2chars(mocker.Mock(args=[str(xml)]))
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[:5] == [
+        '1 one.filtered-ascertained',
+        '2 one.filtered-2',
+        '3 one.filtered-3',
+        '4 one.filtered-4',
+        '5 two.filtered-ascertained',
+    ]
+    assert lines[-1] == '10 later-3'
@@ -0,0 +1,150 @@
+# coding=utf-8
+from phlorest.bipartitions import TaxonSet, Tree, CladeCounts, TopologyCounts, compare, deduplicate
+from phlorest import Phlorest
+from phlorest.synthetic import make_dataset
+from phlorest.validation import Collector
+
+
+def test_taxonset():
+    ts = TaxonSet(['c', 'a', 'b'])
+    assert ts.bits == {'a': 1, 'b': 2, 'c': 4}
+    assert ts.bitset(['a', 'c']) == 5
+    assert ts.labels(6) == ['b', 'c']
+    assert ts.bit('d') == 8
+    assert len(ts) == 4
+
+
+def test_tree():
+    ts = TaxonSet(['A', 'B', 'C', 'D'])
+    tree = Tree.from_newick("(((1:1,2:2)x:0.5,3:1)[&c=1]:0.25,4:3);", ts, {'1': 'A', '2': 'B', '3': 'C', '4': 'D'})
+    assert tree.tips == 15
+    assert tree.clades == frozenset([3, 7])
+    assert tree.lengths[3] == 0.5
+    assert tree.lengths[7] == 0.25
+    assert tree.lengths[8] == 3
+
+
+def test_tree_ordering_independent():
+    ts = TaxonSet()
+    a = Tree.from_newick("((A,B),(C,D));", ts)
+    b = Tree.from_newick("((D,C),(B,A));", ts)
+    assert a.clades == b.clades
+
+
+def test_topology():
+    ts = TaxonSet()
+    a = Tree.from_newick("((A:1,B:1):1,(C:1,D:1):2);", ts)
+    b = Tree.from_newick("((D:1,C:1):2.001,(B:1,A:1):1);", ts)
+    c = Tree.from_newick("((A:1,C:1):1,(B:1,D:1):2);", ts)
+    assert a.topology() == b.topology() != c.topology()
+    assert a.topology(digits=2) == b.topology(digits=2)
+    assert a.topology(digits=3) != b.topology(digits=3)
+
+
+TREES = """#NEXUS
+begin trees;
+    translate 1 A, 2 B, 3 C, 4 D;
+    tree t1 = ((1,2),(3,4));
+    tree t2 = ((3,4),(2,1));
+    tree t3 = ((1,3),(2,4));
+    tree t4 = ((2,1),(4,3));
+end;
+"""
+
+
+def test_topologycounts(tmp_path):
+    (tmp_path / 'p.trees').write_text(TREES)
+    counts = TopologyCounts.from_file(tmp_path / 'p.trees')
+    assert counts.ntrees == 4
+    assert len(counts) == 2
+    assert [(n, f) for _, n, f in counts.frequencies()] == [(3, 0.75), (1, 0.25)]
+    
+    written = deduplicate(tmp_path / 'p.trees', tmp_path / 'd.trees')
+    assert len(written) == 2
+    text = (tmp_path / 'd.trees').read_text()
+    assert 'tree t1 = [&W 0.75] ((1,2),(3,4));' in text
+    assert 'tree t3 = [&W 0.25] ((1,3),(2,4));' in text
+    assert 't2' not in text and 'translate' in text
+    assert len(TopologyCounts.from_file(tmp_path / 'd.trees')) == 2
+
+
+def test_topologycounts_beast1(tmp_path):
+    (tmp_path / 'p.trees').write_text(
+        TREES.replace('tree t1 =', 'tree t1 [&lnP=-10.5] =').replace('tree t2 =', 'tree t2 [&lnP=-11.5] ='))
+    counts = TopologyCounts.from_file(tmp_path / 'p.trees')
+    assert len(counts) == 2
+    assert sorted(counts.taxonset.taxa) == ['A', 'B', 'C', 'D']
+    
+    deduplicate(tmp_path / 'p.trees', tmp_path / 'd.trees')
+    assert 'tree t1 [&lnP=-10.5] = [&W 0.75] ((1,2),(3,4));' in (tmp_path / 'd.trees').read_text()
+
+
+def test_deduplicate_in_place(tmp_path):
+    (tmp_path / 'p.trees').write_text(TREES)
+    assert len(deduplicate(tmp_path / 'p.trees', tmp_path / 'p.trees')) == 2
+    counts = TopologyCounts.from_file(tmp_path / 'p.trees')
+    assert counts.ntrees == 2 and len(counts) == 2
+
+
+def test_cladecounts(g2015):
+    counts = CladeCounts.from_file(g2015.posterior)
+    assert counts.ntrees == 1000
+    assert len(counts.tipsets) == 1
+    assert counts.frequency(counts.taxonset.bitset(['burum', 'mindik'])) == 1.0
+
+
+def test_compare(g2015):
+    summary_only, posterior_only, unsupported = compare(g2015.summary, g2015.posterior, 0.7)
+    assert summary_only == posterior_only == []
+    assert unsupported == [(['borong', 'burum', 'mindik', 'dedua', 'kube', 'tobo'], 0.648)]
+
+
+def test_compare_mismatch(tmp_path):
+    (tmp_path / 's.trees').write_text("#NEXUS\nbegin trees;\ntree a = ((A,B),(C,D));\nend;\n")
+    (tmp_path / 'p.trees').write_text("#NEXUS\nbegin trees;\ntree a = ((A,B),(C,E));\nend;\n")
+    summary_only, posterior_only, unsupported = compare(tmp_path / 's.trees', tmp_path / 'p.trees')
+    assert summary_only == ['D']
+    assert posterior_only == ['E']
+    assert unsupported == [(['C', 'D'], 0.0)]
+
+
+def test_validate_support(g2015):
+    results = g2015.validate(collector=Collector(), support=0.7)
+    support = [r for r in results if r.check == 'support']
+    assert len(support) == 1
+    assert 'borong,burum,mindik,dedua,kube,tobo (0.65)' in support[0].message
+    assert not [r for r in g2015.validate(collector=Collector()) if r.check == 'support']
+
+
+def test_validate_topologies(g2015):
+    results = g2015.validate(collector=Collector(), topologies=True)
+    topologies = [r for r in results if r.check == 'topologies']
+    assert len(topologies) == 1
+    assert 'in 1000 trees in greenhill2015 posterior' in topologies[0].message
+    assert len(g2015.topologies) > 1
+
+
+def test_validate_posterior_tips(tmp_path):
+    path = make_dataset(tmp_path, 'one', ntaxa=4, seed=1)
+    (path / 'summary.trees').write_text(
+        "#NEXUS\nbegin trees;\ntree a = ((taxon_1,taxon_2),(taxon_3,taxon_4));\nend;\n")
+    (path / 'posterior.trees').write_text(
+        "#NEXUS\nbegin trees;\n"
+        "tree a = ((taxon_1,taxon_2),(taxon_3,taxon_4));\n"
+        "tree b = ((taxon_1,taxon_2),taxon_3);\n"
+        "end;\n")
+    messages = [r.message for r in Phlorest(path).validate(collector=Collector()) if r.check == 'trees']
+    assert messages == ["Tips differ between one posterior trees: ['taxon_4'] missing from some trees"]
+
+
+def test_validate_reads_posterior_once(mocker):
+    import phlorest.trees
+    import phlorest.bipartitions
+    ds = Phlorest('tests/testdata')
+    opened = [
+        mocker.spy(phlorest.trees, 'open_text'),
+        mocker.spy(phlorest.bipartitions, 'open_text'),
+    ]
+    results = ds.validate(collector=Collector(), support=0.7, topologies=True)
+    assert {r.check for r in results} >= {'support', 'topologies'}
+    assert sum(1 for spy in opened for call in spy.call_args_list if call.args[0] == ds.posterior) == 1
@@ -0,0 +1,43 @@
+# coding=utf-8
+import os
+import shutil
+
+import pytest
+
+from phlorest import Phlorest
+from phlorest.build import build, is_stale, targets
+from phlorest.synthetic import make_dataset
+
+pytestmark = pytest.mark.skipif(shutil.which('make') is None, reason="needs make")
+
+
+def touch(path, mtime):
+    os.utime(str(path), ns=(mtime, mtime))
+
+
+def test_build(tmp_path):
+    path = make_dataset(tmp_path, 'one', seed=1)
+    dataset = Phlorest(path)
+    assert targets(dataset.makefile) == ['summary']
+    
+    mtime = (path / 'summary.trees').stat().st_mtime_ns
+    touch(path / 'Makefile', mtime - 2 * 10 ** 9)
+    touch(path / 'summary.trees', mtime - 2 * 10 ** 9)
+    touch(path / 'original' / 'one.trees', mtime - 2 * 10 ** 9)
+    assert not is_stale(dataset)
+    
+    touch(path / 'original' / 'one.trees', mtime - 10 ** 9)
+    assert is_stale(dataset)
+    
+    lines = []
+    results = list(build({'one': dataset}, jobs=2, log=lambda name, line: lines.append((name, line))))
+    assert [(r.dataset, r.returncode) for r in results] == [('one', 0)]
+    assert ('one', 'cp original/one.trees summary.trees') in lines
+    assert not is_stale(dataset)
+    
+    (path / 'summary.trees').unlink()
+    dataset.refresh()
+    assert is_stale(dataset)
+    
+    (path / 'Makefile').write_text("all:\n\tfalse\n", encoding='utf8')
+    assert list(build({'one': dataset}))[0].returncode != 0
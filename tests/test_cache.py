@@ -0,0 +1,42 @@
+# coding=utf-8
+import os
+
+from phlorest.cache import FileCache
+
+
+def test_filecache(tmp_path, mocker):
+    path = tmp_path / 'x.txt'
+    path.write_text('one')
+    loader = mocker.Mock(side_effect=lambda p: p.read_text())
+    cache = FileCache()
+    assert cache.get(path, loader) == 'one'
+    assert cache.get(path, loader) == 'one'
+    assert loader.call_count == 1
+    assert len(cache) == 1
+    
+    # changed size invalidates
+    path.write_text('three')
+    assert cache.get(path, loader) == 'three'
+    assert loader.call_count == 2
+    
+    # changed mtime invalidates
+    os.utime(str(path), ns=(0, 0))
+    assert cache.get(path, loader) == 'three'
+    assert loader.call_count == 3
+    
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_filecache_closes_evicted(tmp_path, mocker):
+    path = tmp_path / 'x.txt'
+    path.write_text('one')
+    loader = mocker.Mock(side_effect=lambda p: mocker.Mock())
+    cache = FileCache()
+    first = cache.get(path, loader)
+    path.write_text('three')
+    second = cache.get(path, loader)
+    first.close.assert_called_once_with()
+    assert not second.close.called
+    cache.clear()
+    second.close.assert_called_once_with()
@@ -1,9 +1,15 @@
 # coding=utf-8
+import io
+import csv
+import json
+import shutil
+
 import pytest
 
 import phlorest
 from phlorest import __main__
-from phlorest.commands import CHECKMARK
+from phlorest.commands import CHECKMARK, ERROR
+from phlorest.synthetic import make_repository
 
 from clldutils.clilib import ParserError
 
@@ -16,6 +22,20 @@ def test_listdatasets(repos, mocker, capsys):
     assert '🌿' in captured.out
 
 
+def test_listdatasets_format(repos, mocker, capsys):
+    phlorest.commands.listdatasets(mocker.Mock(repos=repos, args=['--format', 'jsonl']))
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert rows[0]['dataset'] == 'testdata'
+    assert rows[0]['summary'] is True
+    
+    phlorest.commands.listdatasets(mocker.Mock(repos=repos, args=['--format', 'csv']))
+    rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    assert rows[0]['dataset'] == 'testdata'
+    
+    with pytest.raises(ParserError):
+        phlorest.commands.listdatasets(mocker.Mock(repos=repos, args=['--format', 'xml']))
+
+
 def test_check(repos, mocker, capsys):
     errors = phlorest.commands.check(mocker.Mock(repos=repos, args=[]))
     captured = capsys.readouterr()
@@ -28,7 +48,77 @@ def test_validate(repos, mocker, capsys):
     phlorest.commands.validate(mocker.Mock(repos=repos, args=[]))
     captured = capsys.readouterr()
     assert 'No data in greenhill2015 data.nex!' in captured.out
-    assert 'No data in greenhill2015.posterior!' in captured.out
+    assert 'No data in greenhill2015.posterior!' not in captured.out
+
+
+def test_check_format(repos, mocker, capsys):
+    phlorest.commands.check(mocker.Mock(repos=repos, args=['--format', 'jsonl']))
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert rows == [{'dataset': 'testdata', 'errors': []}]
+
+
+def test_validate_format(repos, mocker, capsys):
+    phlorest.commands.validate(mocker.Mock(repos=repos, args=['--format', 'csv']))
+    rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    assert rows[0]['dataset'] == 'testdata'
+    assert rows[0]['valid'] == 'False'
+    assert 'No data in greenhill2015 data.nex!' in rows[0]['messages']
+
+
+def test_validate_topologies(mocker, capsys, tmp_path):
+    make_repository(tmp_path, ndatasets=1)
+    repos = phlorest.Repos(tmp_path)
+    phlorest.commands.validate(mocker.Mock(repos=repos, args=['--topologies']))
+    out = capsys.readouterr().out
+    assert '%s synthetic0001' % CHECKMARK in out
+    assert ERROR not in out
+    assert 'distinct topologies in 10 trees' in out
+    
+    phlorest.commands.validate(mocker.Mock(repos=repos, args=['--topologies', '--format', 'jsonl']))
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert rows[0]['valid'] is True
+    assert rows[0]['messages']
+
+
+def test_validate_jobs(repos, mocker, capsys):
+    phlorest.commands.validate(mocker.Mock(repos=repos, args=['--jobs', '2', 'testdata']))
+    captured = capsys.readouterr()
+    assert 'No data in greenhill2015 data.nex!' in captured.out
+    
+    with pytest.raises(ParserError):
+        phlorest.commands.validate(mocker.Mock(repos=repos, args=['--jobs', 'x']))
+
+
+def test_validate_support(repos, mocker, capsys):
+    phlorest.commands.validate(mocker.Mock(repos=repos, args=['--support', '0.7']))
+    assert 'posterior support below 0.70' in capsys.readouterr().out
+
+
+def test_validate_glottolog(repos, mocker, capsys, tmp_path):
+    snapshot = tmp_path / 'languoid.csv'
+    snapshot.write_text("id,iso639P3code\nkate1253,kmg\n", encoding='utf8')
+    phlorest.commands.validate(mocker.Mock(repos=repos, args=['--glottolog', str(snapshot)]))
+    assert 'Invalid glottocodes in greenhill2015 taxa.csv' in capsys.readouterr().out
+
+
+def test_validate_profile(repos, mocker, capsys, tmp_path):
+    trace = tmp_path / 'trace.json'
+    phlorest.commands.validate(mocker.Mock(repos=repos, args=['--profile', '--trace', str(trace)]))
+    captured = capsys.readouterr()
+    assert 'Input Size' in captured.out
+    assert 'Peak Memory' not in captured.out
+    assert 'posterior' in captured.out
+    assert trace.exists()
+    
+    phlorest.commands.validate(mocker.Mock(repos=repos, args=['--profile-memory']))
+    assert 'Peak Memory' in capsys.readouterr().out
+
+
+def test_check_profile(repos, mocker, capsys):
+    phlorest.commands.check(mocker.Mock(repos=repos, args=['--profile']))
+    captured = capsys.readouterr()
+    assert CHECKMARK in captured.out
+    assert 'Input Size' in captured.out
 
 
 def test_new(repos, mocker):
@@ -47,6 +137,90 @@ def test_dplace(repos, mocker, capsys):
     phlorest.commands.dplace(mocker.Mock(repos=repos, args=['testdata']))
     captured = capsys.readouterr()
     assert 'greenhill2015,Huon Peninsula (Greenhill 2015),' in captured.out
+    assert captured.out.splitlines()[0].endswith(',taxa,summary_trees,posterior_trees')
+    assert captured.out.splitlines()[1].endswith(',14,1,1000')
+    
+    phlorest.commands.dplace(mocker.Mock(repos=repos, args=['--all']))
+    captured = capsys.readouterr()
+    assert len(captured.out.splitlines()) == 2
+    
+    with pytest.raises(AssertionError):
+        phlorest.commands.dplace(mocker.Mock(repos=repos, args=['testdata', 'nope']))
+
+
+@pytest.mark.parametrize('cache', [False, True])
+def test_dplace_broken_sibling(mocker, capsys, tmp_path, cache):
+    shutil.copytree('tests/testdata', str(tmp_path / 'testdata'))
+    (tmp_path / 'broken').mkdir()
+    (tmp_path / 'broken' / 'details.txt').write_text('id: [unclosed\n', encoding='utf8')
+    repos = phlorest.Repos(tmp_path, cache=cache)
+    phlorest.commands.dplace(mocker.Mock(repos=repos, args=['testdata']))
+    assert capsys.readouterr().out.splitlines()[1].endswith(',14,1,1000')
+    phlorest.commands.dplace(mocker.Mock(repos=repos, args=['testdata']))
+    assert capsys.readouterr().out.splitlines()[1].endswith(',14,1,1000')
+
+
+def test_dplace_all(mocker, capsys, tmp_path):
+    make_repository(tmp_path, ndatasets=3)
+    repos = phlorest.Repos(tmp_path, cache=True)
+    get = mocker.spy(phlorest.index.RepositoryIndex, 'get')
+    ntrees = mocker.spy(phlorest.index.RepositoryIndex, 'ntrees')
+    phlorest.commands.dplace(mocker.Mock(repos=repos, args=['--all']))
+    rows = capsys.readouterr().out.splitlines()
+    assert len(rows) == 4
+    assert rows[1].endswith(',10,1,10')
+    assert get.call_count == 0
+    assert ntrees.call_count == 1
+
+
+def test_export(repos, mocker, capsys, tmp_path):
+    import sqlite3
+    with pytest.raises(ParserError):
+        phlorest.commands.export(mocker.Mock(repos=repos, args=[]))
+    
+    db = tmp_path / 'out.db'
+    phlorest.commands.export(mocker.Mock(repos=repos, args=['--sqlite', str(db), '--csv', str(tmp_path / 'csv')]))
+    assert 'wrote 1 datasets' in capsys.readouterr().out
+    conn = sqlite3.connect(str(db))
+    assert conn.execute("SELECT id, ntaxa FROM datasets").fetchall() == [('greenhill2015', 14)]
+    assert conn.execute(
+        "SELECT dataset FROM taxa WHERE isocode = 'kmg'").fetchall() == [('testdata',)]
+    assert conn.execute(
+        "SELECT present FROM files WHERE dataset = 'testdata' AND file = 'summary'").fetchone() == (1,)
+    assert conn.execute("SELECT kind FROM trees ORDER BY kind").fetchall() == [('posterior',), ('summary',)]
+    conn.close()
+    
+    rows = list(csv.DictReader((tmp_path / 'csv' / 'details.csv').open(encoding='utf8')))
+    assert {'dataset': 'testdata', 'key': 'id', 'value': 'greenhill2015'} in rows
+
+
+@pytest.mark.skipif(shutil.which('make') is None, reason="needs make")
+def test_build(mocker, capsys, tmp_path):
+    from phlorest.synthetic import make_dataset
+    make_dataset(tmp_path, 'one', seed=1)
+    (tmp_path / 'one' / 'summary.trees').unlink()
+    repos = phlorest.Repos(tmp_path)
+    phlorest.commands.build(mocker.Mock(repos=repos, args=['--dry-run']))
+    assert '1 datasets to build' in capsys.readouterr().out
+    
+    phlorest.commands.build(mocker.Mock(repos=repos, args=['--jobs', '2']))
+    out = capsys.readouterr().out
+    assert '[one] cp original/one.trees summary.trees' in out
+    assert '%s one in' % CHECKMARK in out
+    
+    phlorest.commands.build(mocker.Mock(repos=repos, args=[]))
+    assert '0 datasets to build' in capsys.readouterr().out
+
+
+def test_topologies(repos, mocker, capsys, tmp_path):
+    output = tmp_path / 'distinct.trees'
+    phlorest.commands.topologies(mocker.Mock(repos=repos, args=['testdata', '--top', '3', '--output', str(output)]))
+    out = capsys.readouterr().out
+    assert 'distinct topologies in 1000 trees' in out
+    assert '[&W ' in output.read_text(encoding='utf8')
+    
+    phlorest.commands.topologies(mocker.Mock(repos=repos, args=['testdata', '--digits', '2']))
+    assert 'Frequency' in capsys.readouterr().out
 
 
 def test_readme(repos, mocker, capsys):
@@ -58,7 +232,22 @@ def test_readme(repos, mocker, capsys):
     assert captured.out.startswith('# Huon Peninsula (Greenhill 2015):')
     assert '[summary.trees](summary.trees)' in captured.out
     assert '14 taxa' in captured.out
-    assert '2 characters'
+    assert '1 characters' in captured.out
+    assert 'distinct topologies)' in captured.out
+
+
+def test_readme_write(mocker, capsys, tmp_path):
+    shutil.copytree('tests/testdata', str(tmp_path / 'testdata'))
+    repos = phlorest.Repos(tmp_path)
+    phlorest.commands.readme(mocker.Mock(repos=repos, args=['--all', '--write', '--jobs', '2']))
+    readme = tmp_path / 'testdata' / 'README.md'
+    assert readme.read_text(encoding='utf8').startswith('# Huon Peninsula (Greenhill 2015):')
+    assert '1 of 1 README files changed' in capsys.readouterr().out
+    
+    mtime = readme.stat().st_mtime_ns
+    phlorest.commands.readme(mocker.Mock(repos=repos, args=['--all', '--write']))
+    assert '0 of 1 README files changed' in capsys.readouterr().out
+    assert readme.stat().st_mtime_ns == mtime
 
 
 def test_itemise(repos, mocker, capsys):
@@ -69,3 +258,37 @@ def test_itemise(repos, mocker, capsys):
     captured = capsys.readouterr()
     assert 'change' in captured.out
 
+
+
+def test_thin(repos, mocker, capsys, tmp_path):
+    with pytest.raises(ParserError):
+        phlorest.commands.thin(mocker.Mock(repos=repos, args=[]))
+    
+    output = tmp_path / 'thin.trees'
+    phlorest.commands.thin(mocker.Mock(
+        repos=repos, args=['testdata', '--burnin', '10%', '--sample', '50', '--output', str(output)]
+    ))
+    captured = capsys.readouterr()
+    assert 'wrote 50 trees' in captured.out
+    assert output.exists()
+    
+    for burnin in ['-3', '1001', '150%']:
+        with pytest.raises(ParserError):
+            phlorest.commands.thin(mocker.Mock(
+                repos=repos, args=['testdata', '--burnin', burnin, '--output', str(tmp_path / 'bad.trees')]
+            ))
+    assert not (tmp_path / 'bad.trees').exists()
+
+
+def test_taxa(repos, mocker, capsys):
+    with pytest.raises(ParserError):
+        phlorest.commands.taxa(mocker.Mock(repos=repos, args=[]))
+    
+    phlorest.commands.taxa(mocker.Mock(repos=repos, args=['--isocode', 'bmu']))
+    captured = capsys.readouterr()
+    assert 'burum' in captured.out
+    assert 'mindik' in captured.out
+    
+    phlorest.commands.taxa(mocker.Mock(repos=repos, args=['--shared']))
+    captured = capsys.readouterr()
+    assert 'Datasets' in captured.out
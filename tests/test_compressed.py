@@ -0,0 +1,66 @@
+# coding=utf-8
+import gzip
+import shutil
+
+import pytest
+
+from phlorest import Phlorest
+from phlorest.compressed import open_replacing, open_text, uncompressed, variants, is_compressed
+from phlorest.trees import scan_trees, thin
+from phlorest.validation import Collector
+
+
+@pytest.mark.parametrize("suffix", ['', '.gz', '.bz2', '.xz'])
+def test_open_text(tmp_path, suffix):
+    path = tmp_path / ('x.trees' + suffix)
+    with open_text(path, 'w') as handle:
+        handle.write('#NEXUS\n')
+    assert is_compressed(path) == bool(suffix)
+    assert uncompressed(path).name == 'x.trees'
+    with open_text(path) as handle:
+        assert handle.read() == '#NEXUS\n'
+
+
+@pytest.mark.parametrize("suffix", ['', '.gz'])
+def test_open_replacing(tmp_path, suffix):
+    path = tmp_path / ('x.trees' + suffix)
+    with open_text(path, 'w') as handle:
+        handle.write('old\n')
+    with open_text(path) as src, open_replacing(path) as out:
+        out.write(src.read().replace('old', 'new'))
+    with open_text(path) as handle:
+        assert handle.read() == 'new\n'
+    
+    with pytest.raises(ZeroDivisionError):
+        with open_replacing(path) as out:
+            out.write('broken')
+            1 / 0
+    with open_text(path) as handle:
+        assert handle.read() == 'new\n'
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+
+def test_variants():
+    assert variants('data.nex') == ['data.nex', 'data.nex.gz', 'data.nex.bz2', 'data.nex.xz']
+
+
+def test_compressed_dataset(tmp_path, g2015):
+    dirname = tmp_path / 'testdata'
+    shutil.copytree(str(g2015.dirname), str(dirname))
+    for name in ['posterior.trees', 'summary.trees', 'data.nex']:
+        with (dirname / name).open('rb') as src, gzip.open(str(dirname / (name + '.gz')), 'wb') as dest:
+            shutil.copyfileobj(src, dest)
+        (dirname / name).unlink()
+    
+    ds = Phlorest(dirname)
+    assert ds.posterior == dirname / 'posterior.trees.gz'
+    assert ds.summary == dirname / 'summary.trees.gz'
+    assert ds.nexus == dirname / 'data.nex.gz'
+    assert ds.check() == []
+    assert ds.trees(ds.posterior).ntrees == 1000
+    assert [r.message for r in ds.validate(collector=Collector())] == [
+        r.message for r in g2015.validate(collector=Collector())
+    ]
+    
+    assert thin(ds.posterior, tmp_path / 'thin.trees.bz2', sample=10) == 10
+    assert scan_trees(tmp_path / 'thin.trees.bz2').ntrees == 10
@@ -0,0 +1,64 @@
+# coding=utf-8
+import os
+
+import pytest
+
+from phlorest.glottolog import Glottolog, sidecar
+from phlorest.validation import Collector
+
+SNAPSHOT = """id,name,iso639P3code,bookkeeping
+kate1253,Kâte,kmg,False
+dedu1240,Dedua,ded,False
+dedu1241,Dedua North,,False
+boro1279,Borong,ksr,True
+"""
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / 'languoid.csv'
+    path.write_text(SNAPSHOT, encoding='utf8')
+    return path
+
+
+def test_compile(snapshot):
+    glottolog = Glottolog.from_file(snapshot)
+    assert glottolog.languoids['kate1253'] == ['kmg', False, None]
+    assert glottolog.isocodes['ded'] == ['dedu1240']
+    assert sidecar(snapshot).exists()
+    assert Glottolog.from_file(snapshot).languoids == glottolog.languoids
+    
+    snapshot.write_text(SNAPSHOT + "buru1306,Burum,bmu,False\n", encoding='utf8')
+    os.utime(str(snapshot), ns=(glottolog.stamp[0] + 10 ** 9, glottolog.stamp[0] + 10 ** 9))
+    assert 'buru1306' in Glottolog.from_file(snapshot).languoids
+    
+    snapshot.write_text("name\nx\n", encoding='utf8')
+    with pytest.raises(ValueError):
+        Glottolog.compile(snapshot)
+
+
+def test_check(snapshot):
+    glottolog = Glottolog.from_file(snapshot)
+    problems = dict(glottolog.check({
+        'a': {'isocode': 'kmg', 'glottocode': 'kate1253'},
+        'b': {'isocode': 'ded', 'glottocode': 'dedu1241'},
+        'c': {'isocode': 'ded', 'glottocode': 'kate1253'},
+        'd': {'isocode': 'ksr', 'glottocode': 'boro1279'},
+        'e': {'isocode': 'xxx', 'glottocode': 'abcd1234'},
+        'f': {'isocode': 'KMG', 'glottocode': 'Kate'},
+    }))
+    assert problems == {
+        'mismatched isocodes and glottocodes': ['c (ded/kate1253)'],
+        'retired glottocodes': ['d (boro1279)'],
+        'unknown isocodes': ['e (xxx)'],
+        'unknown glottocodes': ['e (abcd1234)'],
+        'invalid isocodes': ['f (KMG)'],
+        'invalid glottocodes': ['f (Kate)'],
+    }
+
+
+def test_validate(g2015, snapshot):
+    collector = Collector()
+    g2015.validate(collector=collector, glottolog=Glottolog.from_file(snapshot))
+    messages = [r.message for r in collector if r.check == 'glottolog']
+    assert any(m.startswith('Invalid glottocodes in greenhill2015 taxa.csv') for m in messages)
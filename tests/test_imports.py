@@ -0,0 +1,28 @@
+# coding=utf-8
+import sys
+import time
+import subprocess
+
+# the CLI is called many times from Makefiles and scripts so needs to start fast.
+IMPORT_BUDGET = 0.5  # seconds over a bare interpreter
+HEAVY = ['yaml', 'nexus', 'tabulate', 'sqlite3', 'concurrent.futures', 'xml.etree.ElementTree']
+
+
+def run(code):
+    start = time.perf_counter()
+    out = subprocess.check_output([sys.executable, '-c', code])
+    return time.perf_counter() - start, out.decode('utf8').strip()
+
+
+def test_heavy_modules_are_deferred():
+    _, out = run(
+        "import sys, phlorest.__main__; "
+        "print(','.join(m for m in %r if m in sys.modules))" % HEAVY
+    )
+    assert out == ''
+
+
+def test_import_budget():
+    bare = min(run("pass")[0] for _ in range(3))
+    cli = min(run("import phlorest.__main__")[0] for _ in range(3))
+    assert cli - bare < IMPORT_BUDGET
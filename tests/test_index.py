@@ -0,0 +1,88 @@
+# coding=utf-8
+import shutil
+
+from phlorest import Repos
+from phlorest.index import RepositoryIndex, DatasetRecord, fingerprint
+
+
+def test_fingerprint(tmp_path):
+    shutil.copytree('tests/testdata', str(tmp_path / 'testdata'))
+    fp = fingerprint(tmp_path / 'testdata')
+    assert fp == fingerprint(tmp_path / 'testdata')
+    (tmp_path / 'testdata' / 'taxa.csv').write_text('taxon\n')
+    assert fp != fingerprint(tmp_path / 'testdata')
+
+
+def test_fingerprint_version(tmp_path, mocker):
+    shutil.copytree('tests/testdata', str(tmp_path / 'testdata'))
+    fp = fingerprint(tmp_path / 'testdata')
+    mocker.patch('phlorest.index.VERSION', 0)
+    assert fp != fingerprint(tmp_path / 'testdata')
+
+
+def test_record(g2015):
+    record = DatasetRecord.from_dataset('testdata', g2015)
+    assert record.errors == []
+    assert record.details['id'] == 'greenhill2015'
+    assert len(record.taxa) == 14
+    assert all(record.files.values())
+
+
+def test_index(tmp_path, mocker):
+    shutil.copytree('tests/testdata', str(tmp_path / 'repos' / 'testdata'))
+    repos = Repos(tmp_path / 'repos', cache=True)
+    assert repos.records['testdata'].errors == []
+    assert (tmp_path / 'repos' / '.phlorest' / 'index.sqlite').exists()
+    
+    # unchanged datasets are read from the index
+    build = mocker.patch('phlorest.index.DatasetRecord.from_dataset')
+    repos = Repos(tmp_path / 'repos', cache=True)
+    assert repos.records['testdata'].details['id'] == 'greenhill2015'
+    assert repos.records['testdata'].taxa == Repos('tests').datasets['testdata'].taxa
+    assert build.call_count == 0
+    mocker.stopall()
+    
+    # changed datasets are refreshed
+    (tmp_path / 'repos' / 'testdata' / 'Makefile').unlink()
+    repos = Repos(tmp_path / 'repos', cache=True)
+    assert repos.records['testdata'].errors == ['makefile']
+    assert repos.records['testdata'].files['makefile'] is False
+    
+    # and removed datasets are dropped
+    shutil.rmtree(str(tmp_path / 'repos' / 'testdata'))
+    repos = Repos(tmp_path / 'repos', cache=True)
+    assert repos.records == {}
+    assert RepositoryIndex(tmp_path / 'repos' / '.phlorest' / 'index.sqlite').read() == {}
+
+
+def test_repos_record(tmp_path, mocker):
+    shutil.copytree('tests/testdata', str(tmp_path / 'repos' / 'testdata'))
+    repos = Repos(tmp_path / 'repos', cache=True)
+    assert repos.record('testdata').details['id'] == 'greenhill2015'
+    assert repos._records is None
+    
+    build = mocker.patch('phlorest.index.DatasetRecord.from_dataset')
+    assert Repos(tmp_path / 'repos', cache=True).record('testdata').errors == []
+    assert build.call_count == 0
+
+
+def test_repos_without_cache(repos):
+    assert repos.index is None
+    assert repos.records['testdata'].errors == []
+
+
+def test_ntrees(tmp_path, g2015, mocker):
+    index = RepositoryIndex(tmp_path / 'index.sqlite')
+    assert index.ntrees([g2015.summary, g2015.posterior]) == {g2015.summary: 1, g2015.posterior: 1000}
+    scan = mocker.patch('phlorest.index.scan_trees')
+    assert index.ntrees([g2015.posterior]) == {g2015.posterior: 1000}
+    assert scan.call_count == 0
+
+
+def test_tree_counts(tmp_path, repos):
+    shutil.copytree('tests/testdata', str(tmp_path / 'repos' / 'testdata'))
+    (tmp_path / 'repos' / 'testdata' / 'summary.trees').unlink()
+    cached = Repos(tmp_path / 'repos', cache=True)
+    assert cached.tree_counts('testdata') == {'summary': None, 'posterior': 1000}
+    assert repos.tree_counts('testdata') == {'summary': 1, 'posterior': 1000}
+    assert cached.count_trees(['testdata']) == {'testdata': {'summary': None, 'posterior': 1000}}
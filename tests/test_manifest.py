@@ -0,0 +1,56 @@
+# coding=utf-8
+import shutil
+
+from phlorest import Repos
+from phlorest.manifest import Manifest, hash_file
+from phlorest.validation import Collector
+
+
+def test_hash_file(tmp_path):
+    (tmp_path / 'x').write_text('abc')
+    assert hash_file(tmp_path / 'x') == 'a9993e364706816aba3e25717850c26c9cd0d89d'
+
+
+def test_manifest(tmp_path, g2015):
+    manifest = Manifest(tmp_path / 'validate.json')
+    inputs = manifest.inputs('testdata', g2015.dirname)
+    assert len(inputs['details.txt'][2]) == 40
+    assert manifest.get('testdata', inputs) is None
+    
+    results = g2015.validate(collector=Collector('testdata'))
+    manifest.set('testdata', inputs, results)
+    manifest.save()
+    
+    manifest = Manifest(tmp_path / 'validate.json')
+    assert manifest.get('testdata', manifest.inputs('testdata', g2015.dirname)) == results
+    assert manifest.get('testdata', manifest.inputs('testdata', g2015.dirname), {'support': 0.5}) is None
+
+
+def test_manifest_version(tmp_path, g2015, mocker):
+    manifest = Manifest(tmp_path / 'validate.json')
+    inputs = manifest.inputs('testdata', g2015.dirname)
+    manifest.set('testdata', inputs, g2015.validate(collector=Collector('testdata')))
+    manifest.save()
+    assert Manifest(tmp_path / 'validate.json').datasets
+    
+    # results of another version of the checks are dropped
+    mocker.patch('phlorest.manifest.VERSION', 0)
+    assert Manifest(tmp_path / 'validate.json').datasets == {}
+
+
+def test_validate_all_incremental(tmp_path, mocker):
+    shutil.copytree('tests/testdata', str(tmp_path / 'repos' / 'testdata'))
+    expected = list(Repos(tmp_path / 'repos', cache=True).validate_all())
+    assert (tmp_path / 'repos' / '.phlorest' / 'validate.json').exists()
+    
+    validate = mocker.patch('phlorest.phlorest.Phlorest.validate')
+    assert list(Repos(tmp_path / 'repos', cache=True).validate_all()) == expected
+    assert validate.call_count == 0
+    
+    list(Repos(tmp_path / 'repos', cache=True).validate_all(force=True))
+    assert validate.call_count == 1
+    
+    # editing an input triggers revalidation
+    (tmp_path / 'repos' / 'testdata' / 'source.bib').write_text('')
+    list(Repos(tmp_path / 'repos', cache=True).validate_all())
+    assert validate.call_count == 2
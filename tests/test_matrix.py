@@ -0,0 +1,116 @@
+# coding=utf-8
+import io
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from phlorest import Phlorest
+from phlorest.matrix import CharacterMatrix, parse_rows, MISSING, GAP, POLYMORPHIC
+from phlorest.synthetic import make_dataset
+from phlorest.validation import Collector, ERROR
+
+NEXUS = """#NEXUS
+begin data;
+    dimensions ntax=5 nchar=6;
+    format datatype=standard missing=? gap=- symbols="012";
+    matrix
+    a      0 1 0 ? 1 0
+    b      011-00
+    'c d'  0(01)1?10
+    e      ??????
+    f      011-00
+    ;
+end;
+"""
+
+
+@pytest.fixture
+def matrix():
+    return CharacterMatrix.from_handle(io.StringIO(NEXUS))
+
+
+def test_parse_rows():
+    rows = list(parse_rows("matrix\n a 01\n 'b c' 1 0\n\n"))
+    assert rows == [('a', '01'), ('b c', '10')]
+
+
+def test_matrix(matrix):
+    assert matrix.taxa == ['a', 'b', 'c d', 'e', 'f']
+    assert matrix.matrix.dtype == np.uint8
+    assert (matrix.ntaxa, matrix.nchar) == (5, 6)
+    assert list(matrix.matrix[1]) == [0, 1, 1, GAP, 0, 0]
+    assert list(matrix.matrix[2][:4]) == [0, POLYMORPHIC, 1, MISSING]
+
+
+def test_interleaved():
+    m = CharacterMatrix.from_rows([('a', '01'), ('b', '10'), ('a', '1'), ('b', '0')])
+    assert m.taxa == ['a', 'b']
+    assert m.nchar == 3
+    with pytest.raises(ValueError):
+        CharacterMatrix.from_rows([('a', '01'), ('b', '1')])
+
+
+def test_statistics(matrix):
+    assert list(matrix.missing_by_taxon()) == pytest.approx([1 / 6, 1 / 6, 1 / 6, 1, 1 / 6])
+    assert matrix.missing_by_character()[3] == 1.0
+    assert matrix.missing_fraction() == pytest.approx(10 / 30)
+    # per site: 0000 / 111 / 0111 / - / 1010 / 0000
+    assert list(matrix.constant_sites()) == [True, True, False, True, False, True]
+    assert list(matrix.singleton_sites()) == [False, False, True, False, False, False]
+    assert list(matrix.informative_sites()) == [False, False, False, False, True, False]
+    assert matrix.empty_taxa() == ['e']
+    assert matrix.empty_characters() == [4]
+    assert matrix.duplicate_taxa() == [['b', 'f']]
+
+
+def test_phlorest_matrix(tmp_path):
+    ds = Phlorest(make_dataset(tmp_path, 'm', ntaxa=4, nchar=6, seed=1))
+    assert ds.matrix.nchar == 6
+    assert Phlorest('tests/testdata').matrix is None
+    
+    ds.nexus.write_text(NEXUS)
+    results = ds.validate(collector=Collector())
+    messages = [r.message for r in results if r.check == 'matrix']
+    assert messages == [
+        "Taxa with no data in m data.nex: ['e']",
+        "Characters with no data in m data.nex: [4]",
+        "Taxa with identical data in m data.nex: [['b', 'f']]",
+    ]
+
+
+def test_ragged_matrix(tmp_path):
+    ds = Phlorest(make_dataset(tmp_path, 'm', ntaxa=4, nchar=6, seed=1))
+    ds.nexus.write_text("#NEXUS\nbegin data;\nmatrix\nt1 0101\nt2 01;\nend;\n")
+    results = [r for r in ds.validate(collector=Collector()) if r.check == 'matrix']
+    assert [(r.severity, r.message) for r in results] == [
+        (ERROR, "Invalid matrix in m data.nex: Rows in matrix have different lengths")]
+    
+    from phlorest.readme import render
+    assert '* Nexus: [data.nex](data.nex)' in render(ds)
+
+
+def test_readme_matrix(tmp_path, mocker, capsys):
+    import phlorest.commands
+    from phlorest import Repos
+    make_dataset(tmp_path, 'm', ntaxa=4, nchar=6, seed=1)
+    phlorest.commands.readme(mocker.Mock(repos=Repos(tmp_path), args=['m']))
+    assert '4 taxa x 6 characters' in capsys.readouterr().out
+
+
+def test_large_matrix(tmp_path):
+    rng = np.random.RandomState(1)
+    ntaxa, nchar = 1000, 10000
+    path = tmp_path / 'data.nex'
+    symbols = np.array(list('01?'))
+    with path.open('w') as handle:
+        handle.write("#NEXUS\nbegin data;\nmatrix\n")
+        for i in range(ntaxa):
+            handle.write("t%d %s\n" % (i, ''.join(symbols[rng.randint(0, 3, nchar)])))
+        handle.write(";\nend;\n")
+    start = time.perf_counter()
+    m = CharacterMatrix.from_file(path)
+    m.constant_sites(), m.singleton_sites(), m.duplicate_taxa(), m.missing_by_taxon()
+    assert (m.ntaxa, m.nchar) == (ntaxa, nchar)
+    assert time.perf_counter() - start < 10
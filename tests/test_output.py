@@ -0,0 +1,38 @@
+# coding=utf-8
+import io
+import json
+
+import pytest
+
+from phlorest.output import get_writer
+
+
+def test_writers():
+    stream = io.StringIO()
+    with get_writer('jsonl', ['a', 'b'], stream=stream) as writer:
+        writer.write({'a': 1, 'b': ['x', 'y']})
+        assert json.loads(stream.getvalue()) == {'a': 1, 'b': ['x', 'y']}
+    
+    stream = io.StringIO()
+    with get_writer('csv', ['a', 'b'], stream=stream) as writer:
+        writer.write({'a': 1, 'b': ['x', 'y']})
+        writer.write({'a': None, 'b': []})
+    assert stream.getvalue().splitlines() == ['a,b', '1,x;y', ',']
+    
+    stream = io.StringIO()
+    with get_writer('table', ['a'], stream=stream, headers=['A']) as writer:
+        writer.write({'a': 1})
+        assert stream.getvalue() == ''
+    assert stream.getvalue().split()[:2] == ['|', 'A']
+    
+    with pytest.raises(ValueError):
+        get_writer('xml', ['a'])
+
+
+def test_table_writer_error():
+    stream = io.StringIO()
+    with pytest.raises(KeyError):
+        with get_writer('table', ['a'], stream=stream) as writer:
+            writer.write({'a': 1})
+            raise KeyError('a')
+    assert stream.getvalue() == ''
@@ -1,5 +1,6 @@
 # coding=utf-8
 import pytest
+import phlorest.phlorest
 from phlorest import Phlorest, read_csv
 from phlorest.create import create
 
@@ -93,3 +94,33 @@ def test_check(g2015, tmp_path):
 def test_validate(g2015, tmp_path):
     with pytest.warns(UserWarning, match='No data in greenhill2015'):
         g2015.validate()
+
+
+def test_validate_parses_once(tmp_path, mocker):
+    g2015 = Phlorest('tests/testdata')
+    nexus = mocker.patch('phlorest.phlorest.read_nexus', wraps=phlorest.phlorest.read_nexus)
+    with pytest.warns(UserWarning):
+        g2015.validate()
+        g2015.validate()
+    assert nexus.call_count == 1
+    assert g2015.ncharacters == 1
+    assert g2015.bibtex.startswith('@article{Greenhill2015,')
+    assert g2015.trees(g2015.posterior).ntrees == 1000
+
+
+def test_entries(tmp_path):
+    create(tmp_path, 'test_entries')
+    ds = Phlorest(tmp_path / 'test_entries')
+    assert ds.entries()['original'] is True
+    assert ds.entries()['taxa.csv'] is False
+    assert ds.entries('original') == {}
+    assert ds.makefile is None
+    
+    # snapshot is kept until refreshed
+    (tmp_path / 'test_entries' / 'Makefile').write_text('all:')
+    (tmp_path / 'test_entries' / 'original' / 'x.nex').write_text('#NEXUS')
+    assert ds.makefile is None
+    assert ds.original == []
+    ds.refresh()
+    assert ds.makefile == tmp_path / 'test_entries' / 'Makefile'
+    assert ds.original == [tmp_path / 'test_entries' / 'original' / 'x.nex']
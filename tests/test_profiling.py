@@ -0,0 +1,47 @@
+# coding=utf-8
+import json
+
+from phlorest import Phlorest
+from phlorest.profiling import Profiler
+from phlorest.validation import Collector
+
+
+def test_profiler(tmp_path):
+    profiler = Profiler(memory=True)
+    (tmp_path / 'x').write_text('abc')
+    with profiler.stage('ds', 'one', tmp_path / 'x', None):
+        data = [0] * 10000
+    assert len(profiler) == 1
+    stage = profiler.stages[0]
+    assert stage.dataset == 'ds'
+    assert stage.size == 3
+    assert stage.peak > 0
+    assert stage.seconds > 0
+    
+    profiler.write(tmp_path / 'trace.json')
+    trace = json.loads((tmp_path / 'trace.json').read_text())
+    assert trace['stages'][0]['stage'] == 'one'
+
+
+def test_profiler_summary():
+    profiler = Profiler(memory=False)
+    with profiler.stage('a', 'fast'):
+        pass
+    with profiler.stage('a', 'slow'):
+        sum(range(100000))
+    assert [s.stage for s in profiler.ranked()] == ['slow', 'fast']
+    assert [name for name, _ in profiler.totals()] == ['slow', 'fast']
+    assert 'Input Size' in profiler.summary()
+    assert 'Peak Memory' not in profiler.summary()
+    assert all(s.peak == 0 for s in profiler.stages)
+
+
+def test_phlorest_profiler():
+    ds = Phlorest('tests/testdata')
+    ds.profiler = Profiler()
+    ds.validate(collector=Collector())
+    ds.check()
+    stages = {s.stage for s in ds.profiler.stages}
+    assert {'details', 'taxa', 'summary', 'posterior', 'nexus', 'characters', 'files'} <= stages
+    posterior = [s for s in ds.profiler.stages if s.stage == 'posterior'][0]
+    assert posterior.size == ds.posterior.stat().st_size
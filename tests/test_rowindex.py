@@ -0,0 +1,104 @@
+# coding=utf-8
+import os
+
+import pytest
+
+from phlorest import Phlorest
+from phlorest.rowindex import RowIndex, MatrixRows, sidecar
+
+NEXUS = """#NEXUS
+begin data;
+    dimensions ntax=4 nchar=6;
+    format datatype=standard missing=? gap=- symbols="012";
+    matrix
+    a      0 1 0 ? 1 0
+    b      011-00 [a comment]
+    'c d'  0(01)1?10
+    e      ??????;
+end;
+"""
+
+INTERLEAVED = """#NEXUS
+begin characters;
+    format interleave;
+    matrix
+    a 010
+    b 111
+
+    a 22
+    b 00
+    ;
+end;
+"""
+
+
+@pytest.fixture
+def nexus(tmp_path):
+    path = tmp_path / 'data.nex'
+    path.write_text(NEXUS, encoding='utf8')
+    return path
+
+
+def test_rows(nexus):
+    with MatrixRows.from_file(nexus) as rows:
+        assert rows.taxa == ['a', 'b', 'c d', 'e']
+        assert 'c d' in rows and len(rows) == 4
+        assert rows.row('a') == list('010?10')
+        assert rows.row('b') == list('011-00')
+        assert rows.row('c d') == ['0', '(01)', '1', '?', '1', '0']
+        assert rows.row('e') == list('??????')
+        assert rows.column(1) == {'a': '1', 'b': '1', 'c d': '(01)', 'e': '?'}
+        assert rows.columns(4, 6)['b'] == ['0', '0']
+
+
+def test_interleaved(tmp_path):
+    path = tmp_path / 'data.nex'
+    path.write_text(INTERLEAVED, encoding='utf8')
+    with MatrixRows.from_file(path) as rows:
+        assert rows.row('a') == list('01022')
+        assert rows.column(4) == {'a': '2', 'b': '0'}
+
+
+def test_fixed_columns(nexus, mocker):
+    with MatrixRows.from_file(nexus) as rows:
+        assert rows.index.fixed == {'e'}
+        row = mocker.spy(rows, 'row')
+        assert rows.columns(2, 4) == {'a': ['0', '?'], 'b': ['1', '-'], 'c d': ['1', '?'], 'e': ['?', '?']}
+        assert sorted(c.args[0] for c in row.call_args_list) == ['a', 'b', 'c d']
+        assert rows.columns(5, 10)['e'] == ['?']
+        assert rows.columns(-2, 6)['b'] == ['0', '0']
+
+
+def test_sidecar(nexus, tmp_path):
+    cache_dir = tmp_path / '.phlorest'
+    index = RowIndex.from_file(nexus, cache_dir)
+    assert sidecar(nexus, cache_dir).exists()
+    assert sidecar(nexus, cache_dir).parent.parent == cache_dir
+    assert RowIndex.load(nexus, cache_dir).rows == index.rows
+    assert RowIndex.load(nexus, cache_dir).fixed == index.fixed
+    
+    nexus.write_text(NEXUS.replace("'c d'", "c"), encoding='utf8')
+    os.utime(str(nexus), ns=(index.mtime + 10 ** 9, index.mtime + 10 ** 9))
+    assert RowIndex.load(nexus, cache_dir) is None
+    assert 'c' in RowIndex.from_file(nexus, cache_dir).rows
+    assert not (nexus.parent / '.data.nex.idx').exists()
+
+
+def test_phlorest_rows(nexus, tmp_path):
+    dataset = Phlorest(nexus.parent, cache_dir=tmp_path / '.phlorest')
+    rows = dataset.rows
+    assert rows.row('b') == list('011-00')
+    assert dataset.rows is rows
+    assert sidecar(nexus, tmp_path / '.phlorest').exists()
+    
+    # a changed file is mapped again, and the old mapping closed
+    nexus.write_text(NEXUS.replace("'c d'", "c"), encoding='utf8')
+    assert 'c' in dataset.rows
+    assert rows.closed
+    
+    (nexus.parent / 'data.nex.gz').write_bytes(b'')
+    nexus.unlink()
+    dataset.refresh()
+    assert dataset.rows is None
+    with pytest.raises(ValueError):
+        MatrixRows.from_file(nexus.parent / 'data.nex.gz')
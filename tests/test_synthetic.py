@@ -0,0 +1,26 @@
+# coding=utf-8
+import random
+
+from phlorest import Repos
+from phlorest.synthetic import make_repository, random_newick
+from phlorest.trees import get_tips
+
+
+def test_random_newick():
+    tree = random_newick(['a', 'b', 'c', 'd'], random.Random(1))
+    assert sorted(get_tips(tree)) == ['a', 'b', 'c', 'd']
+    assert tree == random_newick(['a', 'b', 'c', 'd'], random.Random(1))
+
+
+def test_make_repository(tmp_path):
+    make_repository(tmp_path, ndatasets=2, ntaxa=5, ntrees=7, nchar=11)
+    repos = Repos(tmp_path)
+    assert sorted(repos.datasets) == ['synthetic0001', 'synthetic0002']
+    
+    ds = repos.datasets['synthetic0001']
+    assert ds.check() == []
+    assert len(ds.taxa) == 5
+    assert ds.trees(ds.posterior).ntrees == 7
+    assert ds.ncharacters == 11
+    assert ds.nexus_data.data.nchar == 11
+    assert [r for _, results in repos.validate_all() for r in results] == []
@@ -0,0 +1,48 @@
+# coding=utf-8
+import pytest
+
+from phlorest.index import DatasetRecord
+from phlorest.taxonindex import TaxonIndex, split_values
+
+
+def record(name, taxa):
+    return DatasetRecord(name, name, {}, {t['taxon']: t for t in taxa}, {}, [])
+
+
+@pytest.fixture
+def index():
+    return TaxonIndex.from_records({
+        'a': record('a', [
+            {'taxon': 'x', 'isocode': 'xxx', 'glottocode': 'xxxx1234', 'xd_ids': 'xd1; xd2', 'soc_ids': ''},
+            {'taxon': 'y', 'isocode': 'yyy', 'glottocode': 'yyyy1234', 'xd_ids': '', 'soc_ids': ''},
+        ]),
+        'b': record('b', [
+            {'taxon': 'x', 'isocode': 'xxx', 'glottocode': 'xxxx1234', 'xd_ids': 'xd2', 'soc_ids': ''},
+        ]),
+    })
+
+
+def test_split_values():
+    assert split_values('taxon', 'a b') == ['a b']
+    assert split_values('xd_ids', 'xd1; xd2,xd3') == ['xd1', 'xd2', 'xd3']
+    assert split_values('xd_ids', '') == []
+
+
+def test_lookup(index):
+    assert index.datasets('glottocode', 'xxxx1234') == ['a', 'b']
+    assert index.datasets('xd_ids', 'xd1') == ['a']
+    assert index.datasets('xd_ids', 'xd2') == ['a', 'b']
+    assert index.lookup('isocode', 'yyy')[0][1]['taxon'] == 'y'
+    assert index.lookup('isocode', 'zzz') == []
+    with pytest.raises(ValueError):
+        index.lookup('nope', 'x')
+
+
+def test_shared(index):
+    assert index.shared() == {'x': ['a', 'b']}
+    assert index.shared('xd_ids') == {'xd2': ['a', 'b']}
+
+
+def test_repos_taxon_index(repos):
+    assert repos.taxon_index.datasets('xd_ids', 'buru1306') == ['testdata']
+    assert len(repos.taxon_index.lookup('xd_ids', 'buru1306')) == 2
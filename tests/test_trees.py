@@ -0,0 +1,138 @@
+# coding=utf-8
+import io
+import pytest
+
+from phlorest.trees import iter_statements, get_newick, get_tips, split_tree, scan_trees, TreeFile
+from phlorest.trees import parse_burnin, select, thin
+
+NEXUS = """#NEXUS
+[a comment; with a semicolon]
+begin trees;
+    translate
+        1 A,
+        2 'B c',
+        3 C
+    ;
+    tree one = [&R] ((1:0.1,2:0.2)[&x=1;y]:0.3,3:0.4);
+    tree two = [&R] ((1:0.1,3:0.2):0.3,2:0.4);
+end;
+"""
+
+
+def test_iter_statements():
+    statements = list(iter_statements(io.StringIO(NEXUS)))
+    assert statements[0] == '#NEXUS\n[a comment; with a semicolon]\nbegin trees'
+    assert statements[2] == 'tree one = [&R] ((1:0.1,2:0.2)[&x=1;y]:0.3,3:0.4)'
+    assert statements[-1] == 'end'
+
+
+@pytest.mark.parametrize("newick,expected", [
+    ("(A,B,C);", ['A', 'B', 'C']),
+    ("((A:1,B:2)AB:3,C:4);", ['A', 'B', 'C']),
+    ("(('a b':1,B[&c=1]:2),C);", ['a b', 'B', 'C']),
+    ("A;", ['A']),
+])
+def test_get_tips(newick, expected):
+    assert get_tips(newick) == expected
+
+
+@pytest.mark.parametrize("statement,expected", [
+    ("tree one = [&R] (A,B);", ('tree one ', '[&R] (A,B);')),
+    ("tree STATE_0 [&lnP=-10.5,posterior=-11.5] = [&R] (A,B)", ('tree STATE_0 [&lnP=-10.5,posterior=-11.5] ', '[&R] (A,B)')),
+    ("tree 'a=b' = (A,B)", ("tree 'a=b' ", '(A,B)')),
+    ("tree one", ('tree one', '')),
+])
+def test_split_tree(statement, expected):
+    assert split_tree(statement) == expected
+    assert get_newick(statement) == expected[1]
+
+
+def test_treefile_beast1():
+    tf = TreeFile.from_handle(io.StringIO(
+        "#NEXUS\nbegin trees;\ntree STATE_0 [&lnP=-10.5,posterior=-11.5] = [&R] ((A:1,B:1):1,C:2);\nend;\n"))
+    assert tf.tips == ['A', 'B', 'C']
+
+
+def test_treefile():
+    tf = TreeFile.from_handle(io.StringIO(NEXUS))
+    assert tf.ntrees == 2
+    assert tf.translate == {'1': 'A', '2': 'B c', '3': 'C'}
+    assert tf.tips == ['A', 'B c', 'C']
+    assert tf.taxa == ['A', 'B c', 'C']
+
+
+def test_treefile_empty():
+    tf = TreeFile.from_handle(io.StringIO("#NEXUS\nbegin taxa;\nend;\n"))
+    assert tf.ntrees == 0
+    assert tf.taxa == []
+
+
+def test_scan_trees(g2015):
+    summary = scan_trees(g2015.summary)
+    assert summary.ntrees == 1
+    assert sorted(summary.taxa) == sorted(g2015.taxa)
+    posterior = scan_trees(g2015.posterior)
+    assert posterior.ntrees == 1000
+    assert sorted(posterior.tips) == sorted(g2015.taxa)
+
+
+@pytest.mark.parametrize("burnin,ntrees,expected", [
+    ('10%', 1000, 100),
+    ('0%', 1000, 0),
+    ('25', 1000, 25),
+    (5, 10, 5),
+])
+def test_parse_burnin(burnin, ntrees, expected):
+    assert parse_burnin(burnin, ntrees) == expected
+
+
+@pytest.mark.parametrize("burnin,ntrees", [
+    ('-3', 10), ('11', 10), ('-1%', 10), ('101%', 10), ('x', 10),
+])
+def test_parse_burnin_out_of_range(burnin, ntrees):
+    with pytest.raises(ValueError):
+        parse_burnin(burnin, ntrees)
+
+
+def test_select():
+    assert list(select(10)) == list(range(10))
+    assert list(select(10, burnin=8)) == [8, 9]
+    assert select(10, burnin=2, sample=4) == [2, 4, 6, 8]
+    assert select(10, sample=3, seed=1) == select(10, sample=3, seed=1)
+    assert len(select(10, sample=3, seed=1)) == 3
+    assert list(select(10, sample=20)) == list(range(10))
+    assert list(select(10, burnin=10)) == []
+    with pytest.raises(ValueError):
+        select(10, burnin=-3, sample=4)
+    with pytest.raises(ValueError):
+        select(10, burnin=11)
+    with pytest.raises(ValueError):
+        select(10, sample=-1)
+
+
+def test_thin(tmp_path, g2015):
+    dest = tmp_path / 'thinned.trees'
+    assert thin(g2015.posterior, dest, burnin='10%', sample=100) == 100
+    thinned = scan_trees(dest)
+    assert thinned.ntrees == 100
+    assert thinned.translate == scan_trees(g2015.posterior).translate
+    assert 'STATE_' in thinned.first
+    
+    assert thin(g2015.posterior, dest, burnin=0, sample=10, seed=42) == 10
+    assert scan_trees(dest).ntrees == 10
+
+
+def test_thin_everything(tmp_path):
+    src, dest = tmp_path / 'in.trees', tmp_path / 'out.trees'
+    src.write_text(NEXUS)
+    assert thin(src, dest) == 2
+    assert TreeFile.from_file(dest).tips == ['A', 'B c', 'C']
+
+
+def test_thin_in_place(tmp_path):
+    src = tmp_path / 'posterior.trees'
+    src.write_text(NEXUS)
+    assert thin(src, src, sample=1) == 1
+    tf = TreeFile.from_file(src)
+    assert tf.ntrees == 1
+    assert tf.translate == {'1': 'A', '2': 'B c', '3': 'C'}
@@ -0,0 +1,57 @@
+# coding=utf-8
+import pytest
+
+from phlorest.validation import Collector, WarningsCollector, Result, validate_dataset
+from phlorest.validation import ERROR, WARNING
+
+
+def test_collector():
+    collector = Collector('x')
+    result = collector.add('taxa', 'No taxa defined', file='x/taxa.csv')
+    assert result == Result('x', 'taxa', WARNING, 'No taxa defined', 'x/taxa.csv')
+    assert list(collector) == [result]
+    assert len(collector) == 1
+
+
+def test_warnings_collector():
+    collector = WarningsCollector('x')
+    with pytest.warns(UserWarning, match='No taxa defined'):
+        collector.add('taxa', 'No taxa defined')
+    assert len(collector) == 1
+
+
+def test_validate_collector(g2015, recwarn):
+    collector = Collector('testdata')
+    results = g2015.validate(collector=collector)
+    assert len(recwarn) == 0
+    assert results == collector.results
+    nexus = [r for r in results if r.check == 'nexus'][0]
+    assert nexus.message == 'No data in greenhill2015 data.nex!'
+    assert nexus.severity == ERROR
+    assert nexus.file.endswith('data.nex')
+    assert nexus.dataset == 'testdata'
+
+
+def test_validate_dataset(g2015):
+    results = validate_dataset(g2015.dirname)
+    assert {r.check for r in results} == {'nexus', 'characters'}
+
+
+def test_validate_all(repos):
+    results = list(repos.validate_all())
+    assert [name for name, _ in results] == ['testdata']
+    assert len(results[0][1]) == 2
+    assert list(repos.validate_all(['nope'])) == []
+
+
+def test_validate_characters_without_trees(tmp_path):
+    from phlorest import Phlorest
+    from phlorest.synthetic import make_dataset
+    path = make_dataset(tmp_path, 'chars', seed=1)
+    (path / 'summary.trees').unlink()
+    (path / 'posterior.trees').unlink()
+    (path / 'data.nex').write_text("#NEXUS\nbegin taxa;\nend;\n", encoding='utf8')
+    results = Phlorest(path).validate(collector=Collector())
+    characters = [r for r in results if r.check == 'characters']
+    assert [r.message for r in characters] == ['No data in chars data.nex!']
+    assert characters[0].severity == ERROR
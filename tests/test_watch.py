@@ -0,0 +1,87 @@
+# coding=utf-8
+import shutil
+
+import pytest
+
+import phlorest.commands
+from phlorest import Repos
+from phlorest.create import create
+from phlorest.synthetic import make_dataset
+from phlorest.watch import Watcher, stamps
+
+
+@pytest.fixture
+def repos(tmp_path):
+    shutil.copytree('tests/testdata', str(tmp_path / 'testdata'))
+    return Repos(tmp_path)
+
+
+def test_stamps(repos):
+    found = stamps(repos.path / 'testdata')
+    assert 'details.txt' in found
+    assert 'paper/Greenhill2015.pdf' in found
+
+
+def test_watcher(repos):
+    watcher = Watcher(repos)
+    changes = watcher.poll()
+    assert [c[0] for c in changes] == ['testdata']
+    assert 'No data in greenhill2015 data.nex!' in changes[0][1]
+    assert watcher.poll() == []
+    
+    # a changed dataset is re-checked, and the difference reported
+    (repos.path / 'testdata' / 'Makefile').unlink()
+    assert watcher.poll() == [('testdata', ['missing makefile'], [])]
+    (repos.path / 'testdata' / 'Makefile').write_text('all:')
+    assert watcher.poll() == [('testdata', [], ['missing makefile'])]
+    
+    # unchanged content means no change in status
+    (repos.path / 'testdata' / 'notes.md').write_text('# Notes changed')
+    assert watcher.poll() == []
+    
+    # new and removed datasets
+    create(repos.path, 'new')
+    changes = watcher.poll()
+    assert [c[0] for c in changes] == ['new']
+    assert 'missing makefile' in changes[0][1]
+    shutil.rmtree(str(repos.path / 'new'))
+    changes = watcher.poll()
+    assert changes[0][0] == 'new' and changes[0][2]
+
+
+def test_watcher_broken_dataset(repos):
+    watcher = Watcher(repos, validate=False)
+    assert watcher.poll() == [('testdata', [], [])]
+    
+    details = repos.path / 'testdata' / 'details.txt'
+    text = details.read_text(encoding='utf8')
+    details.write_text(text + '\nbroken: [unclosed\n', encoding='utf8')
+    changes = watcher.poll()
+    assert len(changes) == 1 and changes[0][0] == 'testdata'
+    assert changes[0][1][0].startswith('failed to check testdata:')
+    
+    details.write_text(text, encoding='utf8')
+    assert watcher.poll() == [('testdata', [], changes[0][1])]
+
+
+def test_watcher_info(tmp_path):
+    path = make_dataset(tmp_path, 'one', ntaxa=4, seed=1)
+    lines = (path / 'data.nex').read_text(encoding='utf8').splitlines()
+    rows = [i for i, line in enumerate(lines) if line.strip().startswith('taxon_')]
+    lines[rows[1]] = lines[rows[0]].replace('taxon_1', 'taxon_2')
+    (path / 'data.nex').write_text("\n".join(lines), encoding='utf8')
+    
+    watcher = Watcher(Repos(tmp_path))
+    changes = watcher.poll()
+    assert [p for p in changes[0][1] if p.startswith('Taxa with identical data')]
+    assert not watcher.failed('one')
+    
+    (path / 'source.bib').unlink()
+    watcher.poll()
+    assert watcher.failed('one')
+
+
+def test_watch_command(repos, mocker, capsys):
+    mocker.patch('time.sleep', side_effect=KeyboardInterrupt)
+    phlorest.commands.watch(mocker.Mock(repos=repos, args=['--no-validate']))
+    assert '✅ testdata' in capsys.readouterr().out